@@ -6,10 +6,9 @@ from typing import Any
 import uvicorn
 from fastapi import FastAPI, HTTPException, Query
 
-from db import connect
+from db import USDC_DECIMALS, connect
 
 
-USDC_DECIMALS = 6
 EXCLUDED_ADDRESSES = {
     # Polymarket Exchange contracts (system addresses)
     "0xc5d563a36ae78145c45a50134d48a1215220f80a",
@@ -37,7 +36,8 @@ def create_app(db_path: str) -> FastAPI:
         limit: int = Query(50, ge=1, le=200),
     ) -> dict[str, Any]:
         order_by = "roi DESC" if sort == "roi" else "total_profit DESC"
-        where_parts = ["address NOT IN ('0xc5d563a36ae78145c45a50134d48a1215220f80a','0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e','0x0000000000000000000000000000000000000000')"]
+        excluded = tuple(sorted(EXCLUDED_ADDRESSES))
+        where_parts = [f"address NOT IN ({','.join('?' * len(excluded))})"]
         if sort == "roi":
             where_parts.append("roi IS NOT NULL")
         where = "WHERE " + " AND ".join(where_parts)
@@ -54,7 +54,7 @@ def create_app(db_path: str) -> FastAPI:
                 ORDER BY {order_by}
                 LIMIT ?
                 """,
-                (limit,),
+                (*excluded, limit),
             ).fetchall()
         finally:
             conn.close()
@@ -103,7 +103,7 @@ def create_app(db_path: str) -> FastAPI:
                 FROM trades t
                 LEFT JOIN token_map tm ON tm.token_id = t.token_id
                 LEFT JOIN markets m ON m.id = tm.market_id
-                WHERE lower(t.maker) = ? OR lower(t.taker) = ?
+                WHERE t.maker = ? OR t.taker = ?
                 ORDER BY t.block_number DESC, t.log_index DESC
                 LIMIT 10
                 """,
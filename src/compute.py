@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 
-from db import db_conn
+from db import bump_data_version, db_conn, refresh_signal_scores
 
 
 def _now_iso() -> str:
@@ -157,6 +157,7 @@ def compute_all(db_path: str) -> None:
             """,
             (now,),
         )
+        refresh_signal_scores(conn)
 
         # Tags
         # Diamond Hands: bought/held into settlement (approx: no trading revenue on that market)
@@ -184,3 +185,6 @@ def compute_all(db_path: str) -> None:
             WHERE roi IS NOT NULL AND roi < -0.50;
             """
         )
+        # Tags were just rebuilt; refresh their planner stats here rather than at app startup.
+        conn.execute("ANALYZE user_tags;")
+        bump_data_version(conn)
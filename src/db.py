@@ -4,11 +4,42 @@ import sqlite3
 from contextlib import contextmanager
 
 
-def connect(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path)
+USDC_DECIMALS = 6
+
+
+def safe_int(x, default: int = 0) -> int:
+    try:
+        if x is None:
+            return default
+        return int(x)
+    except Exception:
+        return default
+
+
+def safe_float(x, default: float | None = None) -> float | None:
+    try:
+        if x is None:
+            return default
+        return float(x)
+    except Exception:
+        return default
+
+
+def connect(db_path: str, *, cached_statements: int = 256, check_same_thread: bool = True) -> sqlite3.Connection:
+    # Larger prepared-statement cache than sqlite3's default (128) so the UI's
+    # per-candidate / per-card queries stay compiled across calls.
+    # check_same_thread=False is for a session's long-lived connection, whose reruns and
+    # fragments may run on different script threads (never concurrently).
+    conn = sqlite3.connect(db_path, cached_statements=cached_statements, check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA foreign_keys=ON;")
+    # Per-connection read tuning for the UI's aggregate queries: memory-mapped reads,
+    # a 64 MiB page cache, in-memory temp b-trees (GROUP BY / ORDER BY), and sorter threads.
+    conn.execute("PRAGMA mmap_size=268435456;")
+    conn.execute("PRAGMA cache_size=-65536;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA threads=4;")
     return conn
 
 
@@ -22,6 +53,59 @@ def db_conn(db_path: str):
         conn.close()
 
 
+def bump_data_version(conn: sqlite3.Connection) -> None:
+    """
+    Record that trades / markets / aggregates changed. The app keys its heavy read caches
+    on this counter, so social writes (follows, swipes) leave them warm.
+    """
+    conn.execute(
+        """
+        INSERT INTO index_state(key, value) VALUES ('data_version', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+        """
+    )
+
+
+def read_data_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM index_state WHERE key = 'data_version'").fetchone()
+    return int(row[0]) if row is not None and row[0] is not None else 0
+
+
+def signal_score(roi, win_rate, total_profit, trades_count, markets_traded) -> int:
+    """
+    Viewer-independent 0..100 "Signal Score" from user_stats aggregates
+    (soft-capped ROI, win rate, profit, activity and breadth).
+    """
+    roi = safe_float(roi, 0.0)
+    win = safe_float(win_rate, 0.0)
+    trades = float(safe_int(trades_count))
+    markets = float(safe_int(markets_traded))
+    profit = float(safe_int(total_profit)) / (10**USDC_DECIMALS)
+
+    # Normalize to [0,1] with soft caps (fast & stable for demos)
+    roi_n = max(0.0, min(1.0, roi / 3.0))  # 0..300%+
+    win_n = max(0.0, min(1.0, win))        # already 0..1
+    trades_n = max(0.0, min(1.0, trades / 120.0))
+    markets_n = max(0.0, min(1.0, markets / 40.0))
+    profit_n = max(0.0, min(1.0, (profit / 5000.0)))  # 5k USDC+
+
+    score = int(round(100.0 * (0.28 * roi_n + 0.22 * win_n + 0.18 * profit_n + 0.18 * trades_n + 0.14 * markets_n)))
+    return max(0, min(100, score))
+
+
+def refresh_signal_scores(conn: sqlite3.Connection) -> None:
+    """
+    Materialize user_stats.signal_score so the UI can filter candidates in SQL.
+    """
+    conn.create_function("signal_score", 5, signal_score, deterministic=True)
+    conn.execute(
+        """
+        UPDATE user_stats
+        SET signal_score = signal_score(roi, win_rate, total_profit, trades_count, markets_traded)
+        """
+    )
+
+
 def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
     row = conn.execute(
         "SELECT 1 FROM sqlite_master WHERE type IN ('table','view') AND name = ?",
@@ -223,6 +307,43 @@ def _ensure_trades_timestamp(conn: sqlite3.Connection) -> None:
     conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp);")
 
 
+def _ensure_trades_window_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Per-address trade lookups go through (maker, timestamp) / (taker, timestamp):
+    windowed activity counts (maker IN (...) AND timestamp >= ?) are answered from
+    the index alone, and plain address filters use its prefix. They replace the
+    single-column maker/taker indexes, which they subsume.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_maker_ts ON trades(maker, timestamp);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_taker_ts ON trades(taker, timestamp);")
+    conn.execute("DROP INDEX IF EXISTS idx_trades_maker;")
+    conn.execute("DROP INDEX IF EXISTS idx_trades_taker;")
+    conn.execute("DROP INDEX IF EXISTS idx_trades_ts_token;")
+
+
+def _ensure_user_tags_tag_index(conn: sqlite3.Connection) -> None:
+    """
+    The primary key (address, tag) serves the correlated EXISTS probe of the tag
+    filter, which looks up one address at a time. (tag, address) serves the
+    tag-first side: the distinct-tag list, and a tag-driven plan for the filter
+    once ANALYZE (run by compute_all) shows a tag to be selective.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_tags_tag_addr ON user_tags(tag, address);")
+
+
+def _ensure_user_stats_signal_score(conn: sqlite3.Connection) -> None:
+    """
+    Materialized Discover "Signal Score" (filled by compute_all). Older DBs get the
+    column added and backfilled once from their existing aggregates.
+    """
+    if _column_type(conn, "user_stats", "signal_score") is None:
+        conn.execute("ALTER TABLE user_stats ADD COLUMN signal_score INTEGER;")
+        refresh_signal_scores(conn)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_user_stats_signal ON user_stats(signal_score, total_profit);"
+    )
+
+
 def init_db(db_path: str) -> None:
     with db_conn(db_path) as conn:
         if _needs_tokenid_text_migration(conn):
@@ -288,8 +409,6 @@ def init_db(db_path: str) -> None:
             );
 
             CREATE INDEX IF NOT EXISTS idx_trades_block ON trades(block_number);
-            CREATE INDEX IF NOT EXISTS idx_trades_maker ON trades(maker);
-            CREATE INDEX IF NOT EXISTS idx_trades_taker ON trades(taker);
             CREATE INDEX IF NOT EXISTS idx_trades_token ON trades(token_id);
 
             CREATE TABLE IF NOT EXISTS user_market_pnl (
@@ -319,7 +438,8 @@ def init_db(db_path: str) -> None:
               win_rate REAL,
               trades_count INTEGER NOT NULL,
               max_trade_usdc INTEGER NOT NULL,
-              updated_at TEXT
+              updated_at TEXT,
+              signal_score INTEGER
             );
 
             CREATE INDEX IF NOT EXISTS idx_user_stats_profit ON user_stats(total_profit);
@@ -383,5 +503,8 @@ def init_db(db_path: str) -> None:
             """
         )
 
-        # Ensure new columns exist on older DB files.
+        # Ensure new columns / indexes exist on older DB files.
         _ensure_trades_timestamp(conn)
+        _ensure_trades_window_indexes(conn)
+        _ensure_user_tags_tag_index(conn)
+        _ensure_user_stats_signal_score(conn)
@@ -6,7 +6,7 @@ from typing import Any, Iterable, Sequence
 
 import requests
 
-from db import db_conn
+from db import bump_data_version, db_conn
 
 
 def _now_iso() -> str:
@@ -190,6 +190,7 @@ def sync_markets(
     with db_conn(db_path) as conn:
         for m in markets:
             _upsert_market(conn, m, now=now)
+        bump_data_version(conn)
 
 
 def sync_markets_by_token_ids(
@@ -216,3 +217,4 @@ def sync_markets_by_token_ids(
     with db_conn(db_path) as conn:
         for m in markets:
             _upsert_market(conn, m, now=now)
+        bump_data_version(conn)
@@ -9,7 +9,7 @@ from typing import Any, Iterable
 from web3 import Web3
 from web3._utils.events import get_event_data
 
-from db import db_conn, init_db
+from db import bump_data_version, db_conn, init_db
 
 
 ORDER_FILLED_EVENT_ABI: dict[str, Any] = {
@@ -341,6 +341,8 @@ def backfill_trades(
                     conn.executemany(insert_sql, rows)
                 inserted = conn.total_changes - before
                 total_inserted += int(inserted)
+                if inserted:
+                    bump_data_version(conn)
                 conn.commit()
 
                 if verbose:
@@ -1,25 +1,128 @@
 from __future__ import annotations
 
 import hashlib
+import heapq
 import html
 import json
 import os
 import random
+import sqlite3
 import time
+from dataclasses import dataclass
 from datetime import date, datetime, timezone
+from functools import lru_cache
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-from db import connect, init_db
+from db import (
+    USDC_DECIMALS,
+    connect,
+    db_conn,
+    init_db,
+    read_data_version,
+    safe_float,
+    safe_int,
+    signal_score,
+)
 
 
-USDC_DECIMALS = 6
 EXCLUDED_ADDRESSES = {
     "0xc5d563a36ae78145c45a50134d48a1215220f80a",
     "0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e",
     "0x0000000000000000000000000000000000000000",
 }
+FOLLOWING_PAGE_SIZE = 10  # watchlist cards rendered per "Load more"
+# EXCLUDED_ADDRESSES as bound parameters: fixed arity keeps the SQL text (and its cached statement) stable.
+_EXCLUDED_PARAMS = tuple(sorted(EXCLUDED_ADDRESSES))
+_SQL_NOT_EXCLUDED = f"address NOT IN ({','.join('?' * len(_EXCLUDED_PARAMS))})"
+
+
+# Hot-path statements, hoisted so every call passes the identical string and
+# hits the connection's prepared-statement cache (see `connect(cached_statements=...)`).
+_SQL_PROFILE_STATS = "SELECT * FROM user_stats WHERE address = ?"
+_SQL_PROFILE_TAGS = "SELECT tag FROM user_tags WHERE address = ? ORDER BY tag"
+
+_SQL_TOP_TOKENS = """
+SELECT token_id, COUNT(*) AS n
+FROM trades
+WHERE maker = ? OR taker = ?
+GROUP BY token_id
+ORDER BY n DESC
+LIMIT ?
+"""
+
+_SQL_TOP_MARKETS = """
+SELECT tm.market_id, COUNT(*) AS n
+FROM trades t
+JOIN token_map tm ON tm.token_id = t.token_id
+WHERE t.maker = ? OR t.taker = ?
+GROUP BY tm.market_id
+ORDER BY n DESC
+LIMIT ?
+"""
+
+_SQL_BUY_RATIO = """
+WITH recent AS (
+  SELECT side
+  FROM trades
+  WHERE maker = ? OR taker = ?
+  ORDER BY block_number DESC, log_index DESC
+  LIMIT ?
+)
+SELECT
+  SUM(CASE WHEN side = 'BUY' THEN 1 ELSE 0 END) AS buys,
+  COUNT(*) AS n
+FROM recent
+"""
+
+_SQL_PROFILE_PNL = """
+SELECT
+  ump.market_id, m.slug, m.question, m.resolution_outcome,
+  ump.cost, ump.trading_revenue, ump.settlement_payout, ump.profit, ump.roi, ump.win
+FROM user_market_pnl ump
+JOIN markets m ON m.id = ump.market_id
+WHERE ump.address = ?
+ORDER BY ump.profit DESC
+LIMIT 20
+"""
+
+_SQL_PROFILE_TRADES = """
+SELECT
+  t.tx_hash, t.log_index, t.block_number,
+  CASE
+    WHEN length(t.tx_hash) <= 22 THEN t.tx_hash
+    ELSE substr(t.tx_hash, 1, 12) || '…' || substr(t.tx_hash, -10)
+  END AS tx_short,
+  t.maker, t.taker, t.side,
+  t.token_id, tm.market_id, tm.outcome_label, m.slug, m.question,
+  t.collateral_amount, t.token_amount, t.price,
+  t.decoded_json
+FROM trades t
+LEFT JOIN token_map tm ON tm.token_id = t.token_id
+LEFT JOIN markets m ON m.id = tm.market_id
+WHERE t.maker = ? OR t.taker = ?
+ORDER BY t.block_number DESC, t.log_index DESC
+LIMIT 10
+"""
+
+# Following-feed card markup, filled per row via str.format_map (values are pre-escaped HTML).
+_FEED_CARD_TEMPLATE = (
+    '<div class="feed-card">'
+    '<div class="feed-header">{pfp}'
+    '<div style="min-width:0">'
+    '<div class="feed-title">{handle} {side_pill} {sector_pill}</div>'
+    '<div class="feed-sub">block {block} · collateral {collateral} USDC · price {price}</div>'
+    "</div></div>"
+    '<div style="margin-top:0.45rem">'
+    "<div><b>market</b>: {market_html} · <b>market_id</b>: {market_id} · <b>outcome</b>: {outcome}</div>"
+    "</div>"
+    '<div class="muted" style="margin-top:0.55rem">'
+    '<a href="{tx_url}" target="_blank">tx {tx_short}</a>'
+    "</div>"
+    "</div>"
+)
 
 
 def _to_usdc(x: int | None) -> float | None:
@@ -35,6 +138,14 @@ def _short_addr(addr: str, *, n: int = 6) -> str:
     return a[: 2 + n] + "…" + a[-n:]
 
 
+def _short_addr_col(addrs: pd.Series, *, n: int = 6) -> pd.Series:
+    """
+    `_short_addr` over a whole column with pandas string ops.
+    """
+    a = addrs.astype("string").fillna("").str.strip()
+    return a.where(a.str.len() <= (2 * n + 2), a.str[: 2 + n] + "…" + a.str[-n:])
+
+
 def _user_id(addr: str) -> str:
     """
     Local-only friendly identifier derived from address (NOT an official Polymarket user id).
@@ -80,9 +191,9 @@ def _blogger_intro(stats) -> str:
     """
     if stats is None:
         return "该博主暂无足够链上统计，先收藏观察。"
-    win = _safe_float(stats["win_rate"], 0.0) or 0.0
-    profit_usdc = _to_usdc(_safe_int(stats["total_profit"], 0)) or 0.0
-    trades = _safe_int(stats["trades_count"], 0)
+    win = safe_float(stats["win_rate"], 0.0) or 0.0
+    profit_usdc = _to_usdc(safe_int(stats["total_profit"], 0)) or 0.0
+    trades = safe_int(stats["trades_count"], 0)
 
     if win >= 0.90 and profit_usdc > 0:
         return f"该博主擅长在预测市场伏击，胜率高达 {win*100:.0f}%，属于「稳健型博主」。"
@@ -108,26 +219,19 @@ def _polymarket_market_url(slug: str) -> str:
         return ""
     return f"https://polymarket.com/market/{s}"
 
-def _safe_int(x, default: int = 0) -> int:
-    try:
-        if x is None:
-            return default
-        return int(x)
-    except Exception:
-        return default
+def _esc(s: object) -> str:
+    # Kept on html.escape: its chained str.replace calls (C fast path when nothing matches) beat a
+    # str.translate table on CPython for the short strings escaped per card/row.
+    return html.escape("" if s is None else str(s))
 
 
-def _safe_float(x, default: float | None = None) -> float | None:
+@lru_cache(maxsize=512)
+def _parse_decoded(raw: str):
+    # Returns None when the payload isn't valid JSON (callers fall back to st.code). Treat as read-only.
     try:
-        if x is None:
-            return default
-        return float(x)
-    except Exception:
-        return default
-
-
-def _esc(s: object) -> str:
-    return html.escape("" if s is None else str(s))
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return None
 
 
 def _row_get(row: object, key: str, default=None):
@@ -178,6 +282,7 @@ def _pfp_colors(seed: str) -> tuple[str, str]:
     return f"#{h[:6]}", f"#{h[6:12]}"
 
 
+@lru_cache(maxsize=8192)
 def _pfp_html(address: str) -> str:
     a = (address or "").strip().lower()
     c1, c2 = _pfp_colors(a)
@@ -198,9 +303,43 @@ def _date_today() -> str:
 
 
 def _norm_addr(addr: str) -> str:
+    # Canonical form used everywhere: trades.maker / taker are stored lowercase at ingest.
     return (addr or "").strip().lower()
 
 
+def _norm_addrs(addresses) -> list[str]:
+    # Normalized, de-duplicated (first-seen order), empties dropped.
+    return list(dict.fromkeys(a for a in (_norm_addr(x) for x in addresses) if a))
+
+
+def _iter_addr_chunks(addrs: list[str], chunk_size: int = 500):
+    """
+    Yield (chunk, q_marks) slices of `addrs` for `IN (...)` queries, keeping the
+    bound-parameter count per statement under SQLite's limit.
+    """
+    size = max(1, int(chunk_size))
+    for i in range(0, len(addrs), size):
+        chunk = addrs[i : i + size]
+        yield chunk, ",".join(["?"] * len(chunk))
+
+
+def _sql_address_hits(q_marks: str, cols: str, where: str = "") -> str:
+    """
+    `hits` CTE: the chunk's trades as maker and as taker, with the matched address as `addr`
+    (a self-trade counts once). Bind the chunk, then any `where` params, once per leg.
+    """
+    extra = f" AND {where}" if where else ""
+    return f"""hits AS (
+              SELECT maker AS addr, {cols}
+              FROM trades
+              WHERE maker IN ({q_marks}){extra}
+              UNION ALL
+              SELECT taker AS addr, {cols}
+              FROM trades
+              WHERE taker IN ({q_marks}) AND taker != maker{extra}
+            )"""
+
+
 def _fmt_hms_from_ts(ts: int | None) -> str:
     try:
         if ts is None:
@@ -215,16 +354,14 @@ def _fmt_hms_from_ts(ts: int | None) -> str:
 
 def _load_known_addresses(conn, limit: int = 50) -> list[str]:
     rows = conn.execute(
-        """
+        f"""
         SELECT address
         FROM user_stats
-        WHERE address NOT IN ('0xc5d563a36ae78145c45a50134d48a1215220f80a',
-                              '0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e',
-                              '0x0000000000000000000000000000000000000000')
+        WHERE {_SQL_NOT_EXCLUDED}
         ORDER BY total_profit DESC
         LIMIT ?
         """,
-        (limit,),
+        (*_EXCLUDED_PARAMS, limit),
     ).fetchall()
     return [r["address"] for r in rows if r and r["address"]]
 
@@ -276,6 +413,7 @@ def _sector_badge(sector: str) -> str:
     return f"{emoji} {label}"
 
 
+@lru_cache(maxsize=4096)
 def _sector_for_market_text(text: str) -> str:
     t = (text or "").lower()
     for sector, keys in _SECTOR_RULES:
@@ -298,45 +436,86 @@ def _top_sectors_for_address(
     addr = _norm_addr(address)
     if not addr:
         return []
+    return _batch_top_sectors(conn, [addr], recent_trades=recent_trades, top_k=top_k).get(addr, [])
+
+
+def _batch_top_sectors(
+    conn,
+    addresses: list[str],
+    *,
+    recent_trades: int = 500,
+    top_k: int = 3,
+    chunk_size: int = 500,
+) -> dict[str, list[str]]:
+    """
+    `_top_sectors_for_address` for many addresses in one query per chunk:
+    ROW_NUMBER() caps each address to its `recent_trades` latest fills, then markets
+    are counted per (address, market) and classified into sectors in Python.
+    Addresses without any mapped market are absent from the result.
+    """
+    addrs = _norm_addrs(addresses)
+    market_rows: dict[str, list[tuple[str, int]]] = {}
+    for chunk, q_marks in _iter_addr_chunks(addrs, chunk_size):
+        hits = _sql_address_hits(q_marks, "token_id, block_number, log_index")
+        rows = conn.execute(
+            f"""
+            WITH {hits},
+            ranked AS (
+              SELECT
+                addr,
+                token_id,
+                ROW_NUMBER() OVER (PARTITION BY addr ORDER BY block_number DESC, log_index DESC) AS rn
+              FROM hits
+            )
+            SELECT r.addr AS addr, m.slug AS slug, m.question AS question, COUNT(*) AS n
+            FROM ranked r
+            JOIN token_map tm ON tm.token_id = r.token_id
+            JOIN markets m ON m.id = tm.market_id
+            WHERE r.rn <= ?
+            GROUP BY r.addr, m.id
+            ORDER BY r.addr, n DESC, m.id
+            """,
+            (*chunk, *chunk, int(recent_trades)),
+        ).fetchall()
+        for r in rows:
+            market_rows.setdefault(r["addr"], []).append(
+                (f"{r['slug'] or ''} {r['question'] or ''}", int(r["n"] or 0))
+            )
+
+    return {addr: _rank_sectors(markets, top_k) for addr, markets in market_rows.items()}
 
-    rows = conn.execute(
-        """
-        WITH recent AS (
-          SELECT token_id
-          FROM trades
-          WHERE maker = ? OR taker = ?
-          ORDER BY block_number DESC, log_index DESC
-          LIMIT ?
-        )
-        SELECT m.slug AS slug, m.question AS question, COUNT(*) AS n
-        FROM recent r
-        JOIN token_map tm ON tm.token_id = r.token_id
-        JOIN markets m ON m.id = tm.market_id
-        GROUP BY m.id
-        ORDER BY n DESC
-        LIMIT 60
-        """,
-        (addr, addr, int(recent_trades)),
-    ).fetchall()
 
+def _rank_sectors(markets: list[tuple[str, int]], top_k: int) -> list[str]:
+    # `markets` is (slug + question, trade count), busiest market first; the 60 busiest are classified.
     counts: dict[str, int] = {}
-    for r in rows:
-        text = f"{r['slug'] or ''} {r['question'] or ''}"
+    for text, n in markets[:60]:
         sector = _sector_for_market_text(text)
-        counts[sector] = counts.get(sector, 0) + int(r["n"] or 0)
-
+        counts[sector] = counts.get(sector, 0) + n
     ranked = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
     return [k for k, _ in ranked[: max(0, int(top_k))] if k]
 
 
+def _top_sectors_from_trades(recent: list[sqlite3.Row], top_k: int) -> list[str]:
+    """`_batch_top_sectors` over rows already fetched by `_batch_recent_trades`."""
+    by_market: dict[str, list] = {}
+    for r in recent:
+        if not r["in_markets"]:
+            continue
+        hit = by_market.setdefault(str(r["market_id"]), [f"{r['slug'] or ''} {r['question'] or ''}", 0])
+        hit[1] += 1
+    ordered = sorted(by_market.items(), key=lambda kv: (-kv[1][1], kv[0]))
+    return _rank_sectors([(text, n) for _, (text, n) in ordered], top_k)
+
+
 def _vspace(px: int = 16) -> None:
     st.markdown(f"<div style='height:{int(px)}px'></div>", unsafe_allow_html=True)
 
-def _truncate_label(s: str, n: int = 15) -> str:
-    t = (s or "").strip()
-    if len(t) <= n:
-        return t
-    return t[:n] + "..."
+def _truncate_label_col(labels: pd.Series, n: int = 15) -> pd.Series:
+    """
+    Strip each label and cut it to `n` characters plus "..." (None becomes "").
+    """
+    t = labels.astype("string").fillna("").str.strip()
+    return t.where(t.str.len() <= n, t.str.slice(0, n) + "...")
 
 
 def _pie_chart(data: pd.DataFrame, *, label_col: str, value_col: str, title: str) -> None:
@@ -421,35 +600,6 @@ def _window_start_ts(window: str, *, anchor_ts: int) -> int | None:
     return max(0, int(anchor_ts) - int(seconds))
 
 
-def _recent_trade_counts(conn, *, start_ts: int) -> dict[str, int]:
-    """
-    Recent activity: counts trades per address in a time window (timestamp-based).
-    """
-    rows = conn.execute(
-        """
-        SELECT lower(maker) AS addr, COUNT(*) AS n
-        FROM trades
-        WHERE timestamp IS NOT NULL AND timestamp >= ?
-        GROUP BY lower(maker)
-        UNION ALL
-        SELECT lower(taker) AS addr, COUNT(*) AS n
-        FROM trades
-        WHERE timestamp IS NOT NULL AND timestamp >= ?
-        GROUP BY lower(taker)
-        """,
-        (int(start_ts), int(start_ts)),
-    ).fetchall()
-    out: dict[str, int] = {}
-    for r in rows:
-        if not r:
-            continue
-        a = (r["addr"] or "").strip().lower()
-        if not a:
-            continue
-        out[a] = out.get(a, 0) + int(r["n"] or 0)
-    return out
-
-
 def _top_markets_in_window(conn, *, start_ts: int, limit: int = 12) -> pd.DataFrame:
     rows = conn.execute(
         """
@@ -464,12 +614,14 @@ def _top_markets_in_window(conn, *, start_ts: int, limit: int = 12) -> pd.DataFr
         """,
         (int(start_ts), int(limit)),
     ).fetchall()
-    data = []
-    for r in rows:
-        if not r:
-            continue
-        data.append({"market_id": r["market_id"], "slug": r["slug"] or "n/a", "trades": int(r["n"] or 0)})
-    return pd.DataFrame(data)
+    # Column-wise construction: no per-row dicts, no dtype inference across records.
+    return pd.DataFrame(
+        {
+            "market_id": [r["market_id"] for r in rows],
+            "slug": [r["slug"] or "n/a" for r in rows],
+            "trades": [int(r["n"] or 0) for r in rows],
+        }
+    )
 
 
 def _trading_volume_by_period(conn, *, start_ts: int, bucket_seconds: int) -> pd.DataFrame:
@@ -491,7 +643,12 @@ def _trading_volume_by_period(conn, *, start_ts: int, bucket_seconds: int) -> pd
     ).fetchall()
     if not rows:
         return pd.DataFrame(columns=["trades"])
-    df = pd.DataFrame([{"bucket_ts": int(r["bucket_ts"] or 0), "trades": int(r["n"] or 0)} for r in rows])
+    df = pd.DataFrame(
+        {
+            "bucket_ts": [int(r["bucket_ts"] or 0) for r in rows],
+            "trades": [int(r["n"] or 0) for r in rows],
+        }
+    )
     df["dt"] = pd.to_datetime(df["bucket_ts"], unit="s", utc=True)
     return df.set_index("dt")[["trades"]]
 
@@ -499,25 +656,18 @@ def _trading_volume_by_period(conn, *, start_ts: int, bucket_seconds: int) -> pd
 def _global_signal_score(stats_row) -> int:
     """
     A demo-friendly "Signal Score" independent of a viewer address.
-    Uses only on-chain-derived aggregates (from user_stats).
+    Uses only on-chain-derived aggregates (from user_stats); same formula as the
+    materialized user_stats.signal_score column.
     """
     if stats_row is None:
         return 0
-    roi = _safe_float(stats_row["roi"], 0.0) or 0.0
-    win = _safe_float(stats_row["win_rate"], 0.0) or 0.0
-    trades = float(_safe_int(stats_row["trades_count"], 0))
-    markets = float(_safe_int(stats_row["markets_traded"], 0))
-    profit = float(_to_usdc(_safe_int(stats_row["total_profit"], 0)) or 0.0)
-
-    # Normalize to [0,1] with soft caps (fast & stable for demos)
-    roi_n = max(0.0, min(1.0, roi / 3.0))  # 0..300%+
-    win_n = max(0.0, min(1.0, win))        # already 0..1
-    trades_n = max(0.0, min(1.0, trades / 120.0))
-    markets_n = max(0.0, min(1.0, markets / 40.0))
-    profit_n = max(0.0, min(1.0, (profit / 5000.0)))  # 5k USDC+
-
-    score = int(round(100.0 * (0.28 * roi_n + 0.22 * win_n + 0.18 * profit_n + 0.18 * trades_n + 0.14 * markets_n)))
-    return max(0, min(100, score))
+    return signal_score(
+        stats_row["roi"],
+        stats_row["win_rate"],
+        stats_row["total_profit"],
+        stats_row["trades_count"],
+        stats_row["markets_traded"],
+    )
 
 
 def _radar5_chart(values: dict[str, float], *, title: str = "") -> None:
@@ -699,6 +849,7 @@ def _follow(conn, *, follower: str, followee: str) -> None:
         (follower, followee, _now_iso()),
     )
     conn.commit()
+    _invalidate_follow_caches()
 
 
 def _unfollow(conn, *, follower: str, followee: str) -> None:
@@ -711,6 +862,7 @@ def _unfollow(conn, *, follower: str, followee: str) -> None:
         (follower, followee),
     )
     conn.commit()
+    _invalidate_follow_caches()
 
 
 def _fetch_followees(conn, follower: str, limit: int = 200) -> list[str]:
@@ -751,7 +903,7 @@ def _fetch_follow_feed(
 
     where: list[str] = [
         "uf.follower_address = ?",
-        "(lower(t.maker) = uf.followee_address OR lower(t.taker) = uf.followee_address)",
+        "(t.maker = uf.followee_address OR t.taker = uf.followee_address)",
     ]
     params: list[object] = [follower]
     if followee:
@@ -778,7 +930,21 @@ def _fetch_follow_feed(
           tm.market_id AS market_id,
           m.slug,
           m.question,
-          tm.outcome_label
+          tm.outcome_label,
+          -- Render-ready strings (same rules as _polygonscan_tx_url / _polymarket_market_url / _short_addr)
+          'https://polygonscan.com/tx/' || t.tx_hash AS tx_url,
+          CASE
+            WHEN trim(coalesce(m.slug, '')) IN ('', 'n/a') THEN ''
+            ELSE 'https://polymarket.com/market/' || trim(m.slug)
+          END AS pm_url,
+          CASE
+            WHEN length(uf.followee_address) <= 14 THEN uf.followee_address
+            ELSE substr(uf.followee_address, 1, 8) || '…' || substr(uf.followee_address, -6)
+          END AS followee_short,
+          CASE
+            WHEN length(t.tx_hash) <= 22 THEN t.tx_hash
+            ELSE substr(t.tx_hash, 1, 12) || '…' || substr(t.tx_hash, -10)
+          END AS tx_short
         FROM trades t
         JOIN user_follows uf
           ON {where[0]}
@@ -820,7 +986,7 @@ def _fetch_recent_trades_for_address(conn, address: str, limit: int = 3) -> list
         FROM trades t
         LEFT JOIN token_map tm ON tm.token_id = t.token_id
         LEFT JOIN markets m ON m.id = tm.market_id
-        WHERE lower(t.maker) = ? OR lower(t.taker) = ?
+        WHERE t.maker = ? OR t.taker = ?
         ORDER BY t.block_number DESC, t.log_index DESC
         LIMIT ?
         """,
@@ -834,15 +1000,7 @@ def _top_market_ids(conn, address: str, limit: int = 25) -> list[str]:
     if not addr:
         return []
     rows = conn.execute(
-        """
-        SELECT tm.market_id, COUNT(*) AS n
-        FROM trades t
-        JOIN token_map tm ON tm.token_id = t.token_id
-        WHERE lower(t.maker) = ? OR lower(t.taker) = ?
-        GROUP BY tm.market_id
-        ORDER BY n DESC
-        LIMIT ?
-        """,
+        _SQL_TOP_MARKETS,
         (addr, addr, int(limit)),
     ).fetchall()
     return [r["market_id"] for r in rows if r and r["market_id"]]
@@ -853,94 +1011,119 @@ def _buy_ratio(conn, address: str, limit: int = 300) -> float | None:
     if not addr:
         return None
     row = conn.execute(
-        """
-        WITH recent AS (
-          SELECT side
-          FROM trades
-          WHERE lower(maker) = ? OR lower(taker) = ?
-          ORDER BY block_number DESC, log_index DESC
-          LIMIT ?
-        )
-        SELECT
-          SUM(CASE WHEN side = 'BUY' THEN 1 ELSE 0 END) AS buys,
-          COUNT(*) AS n
-        FROM recent
-        """,
+        _SQL_BUY_RATIO,
         (addr, addr, int(limit)),
     ).fetchone()
     if not row:
         return None
-    n = _safe_int(row["n"])
+    n = safe_int(row["n"])
     if n <= 0:
         return None
-    buys = _safe_int(row["buys"])
+    buys = safe_int(row["buys"])
     return float(buys) / float(n)
 
 
-def _avg_trade_size_usdc(conn, address: str, *, limit: int = 200) -> float | None:
-    addr = _norm_addr(address)
-    if not addr:
-        return None
-    row = conn.execute(
-        """
-        WITH recent AS (
-          SELECT collateral_amount
-          FROM trades
-          WHERE lower(maker) = ? OR lower(taker) = ?
-          ORDER BY block_number DESC, log_index DESC
-          LIMIT ?
-        )
-        SELECT AVG(CAST(collateral_amount AS REAL)) AS avg_amt
-        FROM recent
-        """,
-        (addr, addr, int(limit)),
-    ).fetchone()
-    if not row:
-        return None
-    try:
-        v = row["avg_amt"]
-        if v is None:
-            return None
-        return _to_usdc(int(float(v)))
-    except Exception:
+def _batch_buy_ratio(conn, addresses: list[str], *, limit: int = 300, chunk_size: int = 500) -> dict[str, float | None]:
+    """
+    `_buy_ratio` for many addresses: one ROW_NUMBER()-capped query per chunk instead of one per address.
+    """
+    addrs = _norm_addrs(addresses)
+    out: dict[str, float | None] = {a: None for a in addrs}
+    for chunk, q_marks in _iter_addr_chunks(addrs, chunk_size):
+        hits = _sql_address_hits(q_marks, "side, block_number, log_index")
+        rows = conn.execute(
+            f"""
+            WITH {hits},
+            ranked AS (
+              SELECT
+                addr,
+                side,
+                ROW_NUMBER() OVER (PARTITION BY addr ORDER BY block_number DESC, log_index DESC) AS rn
+              FROM hits
+            )
+            SELECT addr, SUM(CASE WHEN side = 'BUY' THEN 1 ELSE 0 END) AS buys, COUNT(*) AS n
+            FROM ranked
+            WHERE rn <= ?
+            GROUP BY addr
+            """,
+            (*chunk, *chunk, int(limit)),
+        ).fetchall()
+        for r in rows:
+            n = safe_int(r["n"])
+            if n > 0:
+                out[r["addr"]] = float(safe_int(r["buys"])) / float(n)
+    return out
+
+
+def _batch_recent_trades(
+    conn, addresses: list[str], *, limit: int = 500, chunk_size: int = 500
+) -> dict[str, list[sqlite3.Row]]:
+    """
+    Each address's `limit` latest fills (newest first) with their market, one
+    ROW_NUMBER()-capped query per chunk. Addresses without trades are absent.
+    """
+    addrs = _norm_addrs(addresses)
+    out: dict[str, list[sqlite3.Row]] = {}
+    for chunk, q_marks in _iter_addr_chunks(addrs, chunk_size):
+        hits = _sql_address_hits(q_marks, "tx_hash, block_number, log_index, token_id, side, collateral_amount")
+        rows = conn.execute(
+            f"""
+            WITH {hits},
+            ranked AS (
+              SELECT
+                hits.*,
+                ROW_NUMBER() OVER (PARTITION BY addr ORDER BY block_number DESC, log_index DESC) AS rn
+              FROM hits
+            )
+            SELECT
+              r.addr AS addr,
+              r.tx_hash,
+              r.block_number,
+              r.side,
+              r.collateral_amount,
+              r.token_id,
+              tm.market_id AS market_id,
+              m.id IS NOT NULL AS in_markets,
+              m.slug,
+              m.question,
+              m.resolved,
+              m.winning_token_id
+            FROM ranked r
+            LEFT JOIN token_map tm ON tm.token_id = r.token_id
+            LEFT JOIN markets m ON m.id = tm.market_id
+            WHERE r.rn <= ?
+            ORDER BY r.addr, r.rn
+            """,
+            (*chunk, *chunk, int(limit)),
+        ).fetchall()
+        for r in rows:
+            out.setdefault(r["addr"], []).append(r)
+    return out
+
+
+def _avg_trade_size_usdc(recent: list[sqlite3.Row]) -> float | None:
+    sizes = [int(r["collateral_amount"]) for r in recent if r["collateral_amount"] is not None]
+    if not sizes:
         return None
+    return sum(sizes) / len(sizes) / 1000000.0
 
 
-def _sector_concentration(conn, address: str, *, recent_trades: int = 500) -> tuple[str, float, dict[str, int]]:
+def _sector_concentration(recent: list[sqlite3.Row]) -> tuple[str, float, dict[str, int]]:
     """
-    Returns (top_sector, top_ratio, counts) based on recent traded markets.
+    Returns (top_sector, top_ratio, counts) over the given recent fills (the 80 most-traded markets).
     Uses Gamma metadata when available; falls back to "Other".
     """
-    addr = _norm_addr(address)
-    if not addr:
-        return "Other", 0.0, {}
-    rows = conn.execute(
-        """
-        WITH recent AS (
-          SELECT token_id
-          FROM trades
-          WHERE lower(maker) = ? OR lower(taker) = ?
-          ORDER BY block_number DESC, log_index DESC
-          LIMIT ?
-        )
-        SELECT m.slug AS slug, m.question AS question, COUNT(*) AS n
-        FROM recent r
-        LEFT JOIN token_map tm ON tm.token_id = r.token_id
-        LEFT JOIN markets m ON m.id = tm.market_id
-        GROUP BY tm.market_id
-        ORDER BY n DESC
-        LIMIT 80
-        """,
-        (addr, addr, int(recent_trades)),
-    ).fetchall()
+    by_market: dict[object, list] = {}
+    for r in recent:
+        hit = by_market.get(r["market_id"])
+        if hit is None:
+            by_market[r["market_id"]] = [f"{r['slug'] or ''} {r['question'] or ''}", 1]
+        else:
+            hit[1] += 1
     counts: dict[str, int] = {}
     total = 0
-    for r in rows:
-        if not r:
-            continue
-        text = f"{r['slug'] or ''} {r['question'] or ''}"
+    for text, n in sorted(by_market.values(), key=lambda x: x[1], reverse=True)[:80]:
         sector = _sector_for_market_text(text)
-        n = int(r["n"] or 0)
         total += n
         counts[sector] = counts.get(sector, 0) + n
     if total <= 0:
@@ -949,51 +1132,59 @@ def _sector_concentration(conn, address: str, *, recent_trades: int = 500) -> tu
     return top_sector, float(top_n) / float(total), counts
 
 
-def _odds_hunter_win_rate(conn, address: str, *, max_price: float = 0.25) -> tuple[int, int, float]:
+def _batch_odds_hunter(
+    conn, addresses: list[str], *, max_price: float = 0.25, chunk_size: int = 500
+) -> dict[str, tuple[int, int, float]]:
     """
-    For BUY trades on resolved markets where price <= max_price, compute (n, wins, win_rate).
+    For BUY trades on resolved markets where price <= max_price: address -> (n, wins, win_rate),
+    one grouped query per chunk. Addresses without such trades are absent.
     """
-    addr = _norm_addr(address)
-    if not addr:
-        return 0, 0, 0.0
-    row = conn.execute(
-        """
-        SELECT
-          COUNT(*) AS n,
-          SUM(CASE WHEN m.winning_token_id IS NOT NULL AND t.token_id = m.winning_token_id THEN 1 ELSE 0 END) AS wins
-        FROM trades t
-        LEFT JOIN token_map tm ON tm.token_id = t.token_id
-        LEFT JOIN markets m ON m.id = tm.market_id
-        WHERE (lower(t.maker) = ? OR lower(t.taker) = ?)
-          AND t.side = 'BUY'
-          AND t.price IS NOT NULL
-          AND t.price <= ?
-          AND m.resolved = 1
-        """,
-        (addr, addr, float(max_price)),
-    ).fetchone()
-    if not row:
-        return 0, 0, 0.0
-    n = _safe_int(row["n"])
-    wins = _safe_int(row["wins"])
-    wr = (float(wins) / float(n)) if n > 0 else 0.0
-    return n, wins, wr
+    addrs = _norm_addrs(addresses)
+    out: dict[str, tuple[int, int, float]] = {}
+    for chunk, q_marks in _iter_addr_chunks(addrs, chunk_size):
+        hits = _sql_address_hits(q_marks, "token_id", "side = 'BUY' AND price IS NOT NULL AND price <= ?")
+        rows = conn.execute(
+            f"""
+            WITH {hits}
+            SELECT
+              h.addr AS addr,
+              COUNT(*) AS n,
+              SUM(CASE WHEN m.winning_token_id IS NOT NULL AND h.token_id = m.winning_token_id THEN 1 ELSE 0 END) AS wins
+            FROM hits h
+            JOIN token_map tm ON tm.token_id = h.token_id
+            JOIN markets m ON m.id = tm.market_id
+            WHERE m.resolved = 1
+            GROUP BY h.addr
+            """,
+            (*chunk, float(max_price), *chunk, float(max_price)),
+        ).fetchall()
+        for r in rows:
+            n = safe_int(r["n"])
+            wins = safe_int(r["wins"])
+            out[r["addr"]] = (n, wins, (float(wins) / float(n)) if n > 0 else 0.0)
+    return out
 
 
-def _discover_personas(conn, address: str, stats) -> list[str]:
+def _discover_personas(
+    stats,
+    *,
+    concentration: tuple[str, float, dict[str, int]],
+    sectors: list[str],
+    odds: tuple[int, int, float],
+) -> list[str]:
     """
-    Persona tags (profiling) for Discover card.
+    Persona tags (profiling) for Discover card, from the batched per-address inputs
+    (see `_batch_discover_cards`).
     """
     if stats is None:
         return ["🧩 Unknown"]
     tags: list[str] = []
-    win = _safe_float(stats["win_rate"], 0.0) or 0.0
-    trades = _safe_int(stats["trades_count"], 0)
-    markets = _safe_int(stats["markets_traded"], 0)
-    total_cost = _safe_int(stats["total_cost"], 0)
+    win = safe_float(stats["win_rate"], 0.0) or 0.0
+    trades = safe_int(stats["trades_count"], 0)
+    markets = safe_int(stats["markets_traded"], 0)
+    total_cost = safe_int(stats["total_cost"], 0)
 
-    top_sector, top_ratio, _ = _sector_concentration(conn, address, recent_trades=500)
-    sectors = _top_sectors_for_address(conn, address, recent_trades=500, top_k=5)
+    top_sector, top_ratio, _ = concentration
 
     # 💎 Elite Oracle
     if win >= 0.80 and markets >= 5:
@@ -1004,7 +1195,7 @@ def _discover_personas(conn, address: str, stats) -> list[str]:
         tags.append(f"🐋 定向巨鲸 (Directional Whale) · {top_sector}")
 
     # 🎰 Odds Hunter: buys cheap and wins
-    n, wins, wr = _odds_hunter_win_rate(conn, address, max_price=0.25)
+    n, wins, wr = odds
     if n >= 3 and wr >= 0.66:
         tags.append("🎰 赔率猎人 (Odds Hunter)")
 
@@ -1017,35 +1208,9 @@ def _discover_personas(conn, address: str, stats) -> list[str]:
     return tags[:3]
 
 
-def _fetch_trade_proof_lines(conn, address: str, *, limit: int = 5) -> list[dict[str, str]]:
-    addr = _norm_addr(address)
-    if not addr:
-        return []
-    rows = conn.execute(
-        """
-        SELECT
-          t.tx_hash,
-          t.block_number,
-          t.side,
-          t.price,
-          t.collateral_amount,
-          tm.market_id AS market_id,
-          m.slug,
-          m.question,
-          m.resolved,
-          m.winning_token_id,
-          t.token_id
-        FROM trades t
-        LEFT JOIN token_map tm ON tm.token_id = t.token_id
-        LEFT JOIN markets m ON m.id = tm.market_id
-        WHERE lower(t.maker) = ? OR lower(t.taker) = ?
-        ORDER BY t.block_number DESC, t.log_index DESC
-        LIMIT ?
-        """,
-        (addr, addr, int(limit)),
-    ).fetchall()
+def _trade_proof_lines(recent: list[sqlite3.Row]) -> list[dict[str, str]]:
     out: list[dict[str, str]] = []
-    for r in rows:
+    for r in recent:
         if not r:
             continue
         tx = str(r["tx_hash"] or "")
@@ -1094,20 +1259,13 @@ def _top_token_ids(conn, address: str, limit: int = 30) -> list[str]:
     if not addr:
         return []
     rows = conn.execute(
-        """
-        SELECT token_id, COUNT(*) AS n
-        FROM trades
-        WHERE lower(maker) = ? OR lower(taker) = ?
-        GROUP BY token_id
-        ORDER BY n DESC
-        LIMIT ?
-        """,
+        _SQL_TOP_TOKENS,
         (addr, addr, limit),
     ).fetchall()
     return [r["token_id"] for r in rows if r and r["token_id"]]
 
 
-def _jaccard(a: set[str], b: set[str]) -> float:
+def _jaccard(a: set[str] | frozenset[str], b: set[str] | frozenset[str]) -> float:
     if not a or not b:
         return 0.0
     inter = len(a & b)
@@ -1115,45 +1273,96 @@ def _jaccard(a: set[str], b: set[str]) -> float:
     return float(inter) / float(union) if union else 0.0
 
 
-def _compatibility_score(conn, *, me: str, other: str) -> tuple[int, list[str]]:
+# Upper bound of everything in `_score_against` except trust: token + market + side + tempo + risk.
+_SCORE_MAX_WITHOUT_TRUST = 25 + 25 + 10 + 10 + 10
+
+
+def _trust_for_trades(trades: int) -> int:
+    if trades >= 200:
+        return 20
+    if trades >= 80:
+        return 16
+    if trades >= 20:
+        return 12
+    return 6
+
+
+@dataclass(frozen=True)
+class MeCtx:
     """
-    Simple explainable score 0..100 based on:
-    - token overlap (interest)
-    - style similarity (tempo/risk)
-    - trust (sample size)
+    Viewer-side inputs for `_score_against`, fetched once instead of per candidate.
     """
-    me = _norm_addr(me)
-    other = _norm_addr(other)
-    reasons: list[str] = []
-    if not me or not other or me == other:
-        return 0, reasons
 
+    address: str
+    stats: dict
+    tags: tuple[str, ...]
+    style: dict[str, str]
+    tokens: frozenset[str]
+    markets: frozenset[str]
+    buy: float | None
+
+
+def _precompute_me(conn, me: str) -> MeCtx | None:
+    me = _norm_addr(me)
+    if not me:
+        return None
     me_stats, me_tags = _fetch_profile_stats(conn, me)
-    ot_stats, ot_tags = _fetch_profile_stats(conn, other)
-    if me_stats is None or ot_stats is None:
-        return 0, reasons
+    if me_stats is None:
+        return None
+    return MeCtx(
+        address=me,
+        stats=dict(me_stats),
+        tags=tuple(me_tags),
+        style=_classify_style(me_stats, me_tags),
+        tokens=frozenset(_top_token_ids(conn, me, limit=25)),
+        markets=frozenset(_top_market_ids(conn, me, limit=25)),
+        buy=_buy_ratio(conn, me, limit=200),
+    )
 
-    me_style = _classify_style(me_stats, me_tags)
+
+def _precompute_me_cached(conn, me: str, today: str) -> MeCtx | None:
+    """
+    Same as `_precompute_me`, memoized per session and (me, day) so reruns skip the viewer
+    lookups. A viewer without stats yet is not memoized, so a later `compute_all` is picked up.
+    """
+    cache = st.session_state.setdefault("_me_ctx_cache", {})
+    key = (_norm_addr(me), today)
+    me_ctx = cache.get(key)
+    if me_ctx is None:
+        me_ctx = _precompute_me(conn, me)
+        if me_ctx is not None:
+            cache[key] = me_ctx
+    return me_ctx
+
+
+def _score_against(
+    me_ctx: MeCtx,
+    ot_stats,
+    ot_tags: list[str],
+    ot_tokens: set[str],
+    ot_markets: set[str],
+    ot_buy: float | None,
+) -> tuple[int, list[str]]:
+    """
+    Pure scoring half of `_compatibility_score` (no SQL).
+    """
+    reasons: list[str] = []
+    me_style = me_ctx.style
     ot_style = _classify_style(ot_stats, ot_tags)
 
     # Interest overlap (token + market)
-    me_tokens = set(_top_token_ids(conn, me, limit=25))
-    ot_tokens = set(_top_token_ids(conn, other, limit=25))
-    token_overlap = _jaccard(me_tokens, ot_tokens)
+    token_overlap = _jaccard(me_ctx.tokens, ot_tokens)
     token_score = int(round(25 * token_overlap))
     if token_overlap > 0:
         reasons.append(f"共同交易 token overlap≈{token_overlap:.2f}")
 
-    me_markets = set(_top_market_ids(conn, me, limit=25))
-    ot_markets = set(_top_market_ids(conn, other, limit=25))
-    market_overlap = _jaccard(me_markets, ot_markets)
+    market_overlap = _jaccard(me_ctx.markets, ot_markets)
     market_score = int(round(25 * market_overlap))
     if market_overlap > 0:
         reasons.append(f"共同市场 overlap≈{market_overlap:.2f}")
 
     # Direction bias similarity (BUY ratio)
-    me_buy = _buy_ratio(conn, me, limit=200)
-    ot_buy = _buy_ratio(conn, other, limit=200)
+    me_buy = me_ctx.buy
     side_score = 5
     if me_buy is not None and ot_buy is not None:
         diff = abs(me_buy - ot_buy)
@@ -1173,22 +1382,54 @@ def _compatibility_score(conn, *, me: str, other: str) -> tuple[int, list[str]]:
         reasons.append(f"风险偏好相近（{me_style.get('risk')}）")
 
     # Trust (sample size)
-    trust = 0
-    ot_trades = _safe_int(ot_stats["trades_count"])
-    if ot_trades >= 200:
-        trust = 20
-    elif ot_trades >= 80:
-        trust = 16
-    elif ot_trades >= 20:
-        trust = 12
-    else:
-        trust = 6
+    ot_trades = safe_int(ot_stats["trades_count"])
+    trust = _trust_for_trades(ot_trades)
     reasons.append(f"样本量：trades={ot_trades}")
 
     score = max(0, min(100, token_score + market_score + side_score + tempo_score + risk_score + trust))
     return score, reasons
 
 
+def _compatibility_score(
+    conn,
+    *,
+    me: str,
+    other: str,
+    me_ctx: MeCtx | None = None,
+    score_floor: int = 0,
+) -> tuple[int, list[str]]:
+    """
+    Simple explainable score 0..100 based on:
+    - token overlap (interest)
+    - style similarity (tempo/risk)
+    - trust (sample size)
+    Pass `me_ctx` when scoring many candidates for the same viewer.
+    If `other` cannot possibly reach `score_floor`, returns (0, []) without the per-candidate probes.
+    """
+    me = _norm_addr(me)
+    other = _norm_addr(other)
+    if not me or not other or me == other:
+        return 0, []
+
+    if me_ctx is None:
+        me_ctx = _precompute_me(conn, me)
+    ot_stats, ot_tags = _fetch_profile_stats(conn, other)
+    if me_ctx is None or ot_stats is None:
+        return 0, []
+    max_possible = _SCORE_MAX_WITHOUT_TRUST + _trust_for_trades(safe_int(ot_stats["trades_count"]))
+    if max_possible < score_floor:
+        return 0, []
+
+    return _score_against(
+        me_ctx,
+        ot_stats,
+        ot_tags,
+        set(_top_token_ids(conn, other, limit=25)),
+        set(_top_market_ids(conn, other, limit=25)),
+        _buy_ratio(conn, other, limit=200),
+    )
+
+
 def _load_or_build_daily_picks(
     conn,
     *,
@@ -1247,18 +1488,25 @@ def _load_or_build_daily_picks(
     rng.shuffle(candidates)
     sampled = [a for a in candidates if a != me and a not in swiped_set][:200]
     if sector_filter_set:
-        sampled = [
-            a
-            for a in sampled
-            if set(_top_sectors_for_address(conn, a, recent_trades=500, top_k=2)) & sector_filter_set
-        ]
-
-    scored: list[tuple[int, str]] = []
-    for addr in sampled:
-        s, _ = _compatibility_score(conn, me=me, other=addr)
-        scored.append((s, addr))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    top = [a for _, a in scored[:picks]]
+        sectors_by_addr = _batch_top_sectors(conn, sampled, recent_trades=500, top_k=2)
+        sampled = [a for a in sampled if set(sectors_by_addr.get(a, [])) & sector_filter_set]
+
+    # Top-k with pruning: once `picks` candidates are held, anyone whose best case can't
+    # beat the current k-th score is skipped before its per-candidate SQL probes.
+    # Heap entries are (score, -i, addr) so ties keep the earlier (shuffled) candidate.
+    me_ctx = _precompute_me_cached(conn, me, today)
+    heap: list[tuple[int, int, str]] = []
+    for i, addr in enumerate(sampled):
+        floor = heap[0][0] + 1 if heap and len(heap) >= picks else 0
+        if me_ctx is None:
+            s = 0  # no viewer stats: every candidate scores 0, without re-querying the viewer
+        else:
+            s, _ = _compatibility_score(conn, me=me, other=addr, me_ctx=me_ctx, score_floor=floor)
+        if len(heap) < picks:
+            heapq.heappush(heap, (s, -i, addr))
+        elif heap and s > heap[0][0]:
+            heapq.heapreplace(heap, (s, -i, addr))
+    top = [a for _, _, a in sorted(heap, key=lambda x: (-x[0], -x[1]))]
 
     now = _now_iso()
     for i, addr in enumerate(top, start=1):
@@ -1280,10 +1528,10 @@ def _dating_tags(stats, tags: list[str]) -> list[str]:
     tags_set = set(tags or [])
     style = _classify_style(stats, tags)
 
-    roi = _safe_float(stats["roi"]) if stats is not None else None
-    win_rate = _safe_float(stats["win_rate"]) if stats is not None else None
-    trades = _safe_int(stats["trades_count"]) if stats is not None else 0
-    markets = _safe_int(stats["markets_traded"]) if stats is not None else 0
+    roi = safe_float(stats["roi"]) if stats is not None else None
+    win_rate = safe_float(stats["win_rate"]) if stats is not None else None
+    trades = safe_int(stats["trades_count"]) if stats is not None else 0
+    markets = safe_int(stats["markets_traded"]) if stats is not None else 0
 
     out: list[str] = []
 
@@ -1337,9 +1585,9 @@ def _dating_bio(stats, tags: list[str]) -> str:
     1-2 lines, playful but not cringe.
     """
     style = _classify_style(stats, tags)
-    roi = _safe_float(stats["roi"]) if stats is not None else None
-    win_rate = _safe_float(stats["win_rate"]) if stats is not None else None
-    trades = _safe_int(stats["trades_count"]) if stats is not None else 0
+    roi = safe_float(stats["roi"]) if stats is not None else None
+    win_rate = safe_float(stats["win_rate"]) if stats is not None else None
+    trades = safe_int(stats["trades_count"]) if stats is not None else 0
 
     bits2: list[str] = []
     bits2.append(f"On-chain vibe: {style.get('volume','')} · {style.get('tempo','')} · {style.get('edge','')}")
@@ -1367,13 +1615,11 @@ def _fetch_dating_candidates(
     Note: this is intentionally "fast + coarse"; sector filtering is applied later in Python.
     """
     where: list[str] = [
-        "address NOT IN ('0xc5d563a36ae78145c45a50134d48a1215220f80a',"
-        "              '0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e',"
-        "              '0x0000000000000000000000000000000000000000')",
+        _SQL_NOT_EXCLUDED,
         "trades_count >= ?",
         "markets_traded >= ?",
     ]
-    params: list[object] = [int(min_trades), int(min_markets)]
+    params: list[object] = [*_EXCLUDED_PARAMS, int(min_trades), int(min_markets)]
 
     if min_roi is not None:
         where.append("roi IS NOT NULL AND roi >= ?")
@@ -1390,7 +1636,9 @@ def _fetch_dating_candidates(
     required_tags = [t for t in (required_tags or []) if t]
     if required_tags:
         q_marks = ",".join(["?"] * len(required_tags))
-        where.append(f"address IN (SELECT address FROM user_tags WHERE tag IN ({q_marks}))")
+        where.append(
+            f"EXISTS (SELECT 1 FROM user_tags ut WHERE ut.address = user_stats.address AND ut.tag IN ({q_marks}))"
+        )
         params.extend(required_tags)
 
     order_by = "total_profit DESC"
@@ -1410,27 +1658,89 @@ def _fetch_dating_candidates(
     """
     params.append(int(limit))
 
-    rows = conn.execute(sql, tuple(params)).fetchall()
-    return [r["address"] for r in rows if r and r["address"]]
+    cur = conn.execute(sql, tuple(params))
+    out: list[str] = []
+    while True:
+        batch = cur.fetchmany(256)
+        if not batch:
+            break
+        out.extend(r["address"] for r in batch if r["address"])
+    return out
 
 
 def _fetch_profile_stats(conn, address: str):
     addr = address.strip().lower()
-    stats = conn.execute("SELECT * FROM user_stats WHERE address = ?", (addr,)).fetchone()
-    tags = conn.execute("SELECT tag FROM user_tags WHERE address = ? ORDER BY tag", (addr,)).fetchall()
+    stats = conn.execute(_SQL_PROFILE_STATS, (addr,)).fetchone()
+    tags = conn.execute(_SQL_PROFILE_TAGS, (addr,)).fetchall()
     return stats, [t["tag"] for t in tags]
 
 
+def _batch_profile_stats(conn, addresses: list[str], *, chunk_size: int = 500) -> dict[str, tuple[object, list[str]]]:
+    """
+    `_fetch_profile_stats` for many addresses: address -> (user_stats row or None, tags).
+    """
+    addrs = _norm_addrs(addresses)
+    out: dict[str, tuple[object, list[str]]] = {a: (None, []) for a in addrs}
+    for chunk, q_marks in _iter_addr_chunks(addrs, chunk_size):
+        for r in conn.execute(f"SELECT * FROM user_stats WHERE address IN ({q_marks})", tuple(chunk)):
+            out[r["address"]] = (r, out[r["address"]][1])
+        for r in conn.execute(
+            f"SELECT address, tag FROM user_tags WHERE address IN ({q_marks}) ORDER BY address, tag",
+            tuple(chunk),
+        ):
+            out[r["address"]][1].append(r["tag"])
+    return out
+
+
+def _batch_discover_cards(conn, addresses: list[str]) -> dict[str, dict[str, object]]:
+    """
+    Everything a Discover card renders, for a whole batch of targets at once: a fixed
+    number of batched queries (grouped by address), so Skip/Follow reruns render from memory.
+    """
+    addrs = _norm_addrs(addresses)
+    profiles = _batch_profile_stats(conn, addrs)
+    with_stats = [a for a in addrs if profiles[a][0] is not None]
+    odds = _batch_odds_hunter(conn, with_stats, max_price=0.25)
+    # One scan of each address's latest 600 fills; every trade-window figure below is a prefix of it.
+    recent = _batch_recent_trades(conn, addrs, limit=600)
+    out: dict[str, dict[str, object]] = {}
+    for a in addrs:
+        row = profiles[a][0]
+        stats = dict(row) if row is not None else None
+        trades = recent.get(a, [])
+        latest = trades[:250]
+        out[a] = {
+            "stats": stats,
+            "score": _global_signal_score(stats) if stats is not None else 0,
+            "personas": _discover_personas(
+                stats,
+                concentration=_sector_concentration(trades[:500]),
+                sectors=_top_sectors_from_trades(trades[:500], 5) if stats is not None else [],
+                odds=odds.get(a, (0, 0, 0.0)),
+            ),
+            "intro": _blogger_intro(stats),
+            "buy_pct": sum(1 for r in latest if r["side"] == "BUY") / len(latest) if latest else None,
+            "avg_size": _avg_trade_size_usdc(latest),
+            "sectors": _top_sectors_from_trades(trades, 3) if stats is not None else [],
+            "proof_lines": _trade_proof_lines(trades[:6]),
+        }
+    return out
+
+
+@lru_cache(maxsize=4096)
+def _rng_seed(address: str, nonce: int, salt: str) -> int:
+    # Keyed BLAKE2b with an 8-byte digest: one hash call, no truncation of a longer digest.
+    h = hashlib.blake2b(f"{address}:{nonce}".encode("utf-8"), key=salt.encode("utf-8"), digest_size=8)
+    return int.from_bytes(h.digest(), "big", signed=False)
+
+
 def _rng_for_address(address: str, *, nonce: int = 0, salt: str = "polyrep-v1") -> random.Random:
     """
     Deterministic "random" for a given address (stable copy for screenshots).
     Increment nonce to get a new roll.
     """
     a = (address or "").strip().lower()
-    raw = f"{salt}:{a}:{int(nonce)}".encode("utf-8")
-    digest = hashlib.sha256(raw).digest()
-    seed = int.from_bytes(digest[:8], "big", signed=False)
-    return random.Random(seed)
+    return random.Random(_rng_seed(a, int(nonce), salt))
 
 
 def _pick_trading_archetype(stats, tags: list[str]) -> str:
@@ -1669,94 +1979,214 @@ def _fetch_leaderboard(
     limit: int = 50,
     *,
     required_tags: list[str] | None = None,
+    start_ts: int | None = None,
+    addr_substr: str | None = None,
 ) -> pd.DataFrame:
+    """
+    Top `limit` addresses by ROI/profit. The pool is then narrowed in SQL: `addr_substr` keeps
+    addresses containing it (quick search), and `start_ts` keeps addresses that traded since then,
+    with their in-window trade count as `recent_trades` (0 for everyone when no window is given).
+    """
     order_by = "roi DESC" if sort == "roi" else "total_profit DESC"
-    where_parts = ["address NOT IN ('0xc5d563a36ae78145c45a50134d48a1215220f80a','0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e','0x0000000000000000000000000000000000000000')"]
+    where_parts = [_SQL_NOT_EXCLUDED]
     if sort == "roi":
         where_parts.append("roi IS NOT NULL")
     required_tags = [t for t in (required_tags or []) if t]
     if required_tags:
         q_marks = ",".join(["?"] * len(required_tags))
-        where_parts.append(f"address IN (SELECT address FROM user_tags WHERE tag IN ({q_marks}))")
+        where_parts.append(
+            f"EXISTS (SELECT 1 FROM user_tags ut WHERE ut.address = user_stats.address AND ut.tag IN ({q_marks}))"
+        )
     where = "WHERE " + " AND ".join(where_parts)
-    params: list[object] = []
+    params: list[object] = [*_EXCLUDED_PARAMS]
     if required_tags:
         params.extend(required_tags)
     params.append(limit)
-    rows = conn.execute(
-        f"""
+    pool_sql = f"""
         SELECT
           address,
-          total_cost,
-          total_profit,
+          total_profit / 1000000.0 AS total_profit_usdc,
           roi,
           win_rate,
           markets_traded,
           trades_count,
-          max_trade_usdc
+          max_trade_usdc / 1000000.0 AS max_trade_usdc
         FROM user_stats
         {where}
         ORDER BY {order_by}
         LIMIT ?
-        """,
-        tuple(params),
-    ).fetchall()
-    data = []
-    for r in rows:
-        data.append(
-            {
-                "address": r["address"],
-                "total_profit_usdc": _to_usdc(r["total_profit"]),
-                "roi": r["roi"],
-                "win_rate": r["win_rate"],
-                "markets_traded": r["markets_traded"],
-                "trades_count": r["trades_count"],
-                "max_trade_usdc": _to_usdc(r["max_trade_usdc"]),
-            }
+    """
+    pool_order = "p.roi DESC" if sort == "roi" else "p.total_profit_usdc DESC"
+    addr_substr = (addr_substr or "").strip().lower()
+    if addr_substr:
+        # Search filters the scanned pool (not all of user_stats), same as the table always did.
+        ctes = [f"top AS ({pool_sql})", "pool AS (SELECT * FROM top WHERE instr(address, ?) > 0)"]
+        params.append(addr_substr)
+    else:
+        ctes = [f"pool AS ({pool_sql})"]
+    if start_ts is None:
+        sql = f"""
+        WITH {", ".join(ctes)}
+        SELECT p.*, 0 AS recent_trades
+        FROM pool p
+        ORDER BY {pool_order}
+        """
+    else:
+        # Activity is counted only for pool members (maker/taker index lookups), maker and
+        # taker sides counted separately; the JOIN drops inactive addresses.
+        ctes.append(
+            """activity AS (
+          SELECT addr, SUM(n) AS recent_trades
+          FROM (
+            SELECT maker AS addr, COUNT(*) AS n
+            FROM trades
+            WHERE maker IN (SELECT address FROM pool) AND timestamp >= ?
+            GROUP BY maker
+            UNION ALL
+            SELECT taker AS addr, COUNT(*) AS n
+            FROM trades
+            WHERE taker IN (SELECT address FROM pool) AND timestamp >= ?
+            GROUP BY taker
+          )
+          GROUP BY addr
+        )"""
+        )
+        sql = f"""
+        WITH {", ".join(ctes)}
+        SELECT p.*, a.recent_trades
+        FROM pool p
+        JOIN activity a ON a.addr = p.address
+        ORDER BY {pool_order}
+        """
+        params.extend([int(start_ts), int(start_ts)])
+    # USDC scaling (6 decimals) happens in the SELECT; read_sql_query builds the columns
+    # straight off the cursor (no per-row dicts).
+    return pd.read_sql_query(sql, conn, params=tuple(params))
+
+
+@st.cache_resource(show_spinner=False)
+def _ensure_schema(db_path: str) -> bool:
+    # Ensure schema exists (including Dating tables). Safe and idempotent; once per process.
+    init_db(db_path)
+    return True
+
+
+def _get_conn(db_path: str) -> sqlite3.Connection:
+    """
+    One long-lived connection per Streamlit session and DB path, reused across reruns and
+    fragments (keeps SQLite's page cache and prepared statements warm). A session's script
+    runs are serialized, so the connection (and any open transaction) is never shared
+    between concurrent sessions.
+    """
+    _ensure_schema(db_path)
+    conns = st.session_state.setdefault("_db_conns", {})
+    conn = conns.get(db_path)
+    if conn is None:
+        # Script reruns and fragments may execute on different threads.
+        conn = conns[db_path] = connect(db_path, check_same_thread=False)
+    return conn
+
+
+# --- Cached read helpers (keyed on db_path; a sqlite3.Connection isn't hashable) ---
+# Widget clicks rerun the whole script; these let pagination/search/toggles reuse results.
+# TTL keeps them reasonably fresh; the sidebar "Refresh data" button clears them, and the
+# `data_version` argument (see `db.bump_data_version`) re-keys them whenever compute, ingest or
+# a market sync changes the data. Follow/swipe writes don't bump it; the follow-derived caches
+# below are cleared explicitly by `_invalidate_follow_caches` instead.
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_followees(db_path: str, follower: str, limit: int) -> list[str]:
+    with db_conn(db_path) as conn:
+        return _fetch_followees(conn, follower, limit=limit)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_follow_feed(
+    db_path: str, follower: str, limit: int, followee: str | None, side: str | None
+) -> list[dict[str, object]]:
+    # Short TTL so newly indexed trades show up without a manual refresh.
+    with db_conn(db_path) as conn:
+        return _fetch_follow_feed(conn, follower, limit=limit, followee=followee, side=side)
+
+
+def _invalidate_follow_caches() -> None:
+    # Follow/unfollow changes the watchlist (and therefore the feed) immediately.
+    _cached_followees.clear()
+    _cached_follow_feed.clear()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_leaderboard_pool(
+    db_path: str, sort: str, pool: int, start_ts: int | None, addr_substr: str, data_version: int
+) -> pd.DataFrame:
+    with db_conn(db_path) as conn:
+        return _fetch_leaderboard(
+            conn, sort=sort, limit=pool, required_tags=None, start_ts=start_ts, addr_substr=addr_substr
         )
-    return pd.DataFrame(data)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_top_sector_map(
+    db_path: str, addresses: tuple[str, ...], recent_trades: int, data_version: int
+) -> dict[str, str]:
+    """
+    address -> most-traded sector over its `recent_trades` latest fills (one batched query).
+    """
+    with db_conn(db_path) as conn:
+        sectors = _batch_top_sectors(conn, list(addresses), recent_trades=recent_trades, top_k=1)
+    return {a: secs[0] for a, secs in sectors.items() if secs}
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_latest_trade_ts(db_path: str, data_version: int) -> int:
+    with db_conn(db_path) as conn:
+        return _latest_trade_ts(conn)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_top_markets_in_window(db_path: str, start_ts: int, limit: int, data_version: int) -> pd.DataFrame:
+    with db_conn(db_path) as conn:
+        return _top_markets_in_window(conn, start_ts=start_ts, limit=limit)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_trading_volume_by_period(db_path: str, start_ts: int, bucket_seconds: int, data_version: int) -> pd.DataFrame:
+    with db_conn(db_path) as conn:
+        return _trading_volume_by_period(conn, start_ts=start_ts, bucket_seconds=bucket_seconds)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_profile(db_path: str, address: str, data_version: int):
+    # Rows come back as plain dicts: cache_data pickles results and sqlite3.Row can't be pickled.
+    with db_conn(db_path) as conn:
+        stats, tags, pnl, trades = _fetch_profile(conn, address)
+    return (dict(stats) if stats is not None else None), tags, [dict(r) for r in pnl], [dict(r) for r in trades]
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_top_sectors(db_path: str, address: str, recent_trades: int, top_k: int, data_version: int) -> list[str]:
+    with db_conn(db_path) as conn:
+        return _top_sectors_for_address(conn, address, recent_trades=recent_trades, top_k=top_k)
 
 
 def _fetch_profile(conn, address: str):
     addr = address.strip().lower()
-    stats = conn.execute("SELECT * FROM user_stats WHERE address = ?", (addr,)).fetchone()
-    tags = conn.execute("SELECT tag FROM user_tags WHERE address = ? ORDER BY tag", (addr,)).fetchall()
+    stats = conn.execute(_SQL_PROFILE_STATS, (addr,)).fetchone()
+    tags = conn.execute(_SQL_PROFILE_TAGS, (addr,)).fetchall()
     pnl = conn.execute(
-        """
-        SELECT
-          ump.market_id, m.slug, m.question, m.resolution_outcome,
-          ump.cost, ump.trading_revenue, ump.settlement_payout, ump.profit, ump.roi, ump.win
-        FROM user_market_pnl ump
-        JOIN markets m ON m.id = ump.market_id
-        WHERE ump.address = ?
-        ORDER BY ump.profit DESC
-        LIMIT 20
-        """,
+        _SQL_PROFILE_PNL,
         (addr,),
     ).fetchall()
     trades = conn.execute(
-        """
-        SELECT
-          t.tx_hash, t.log_index, t.block_number,
-          t.maker, t.taker, t.side,
-          t.token_id, tm.market_id, tm.outcome_label, m.slug, m.question,
-          t.collateral_amount, t.token_amount, t.price,
-          t.decoded_json
-        FROM trades t
-        LEFT JOIN token_map tm ON tm.token_id = t.token_id
-        LEFT JOIN markets m ON m.id = tm.market_id
-        WHERE lower(t.maker) = ? OR lower(t.taker) = ?
-        ORDER BY t.block_number DESC, t.log_index DESC
-        LIMIT 10
-        """,
+        _SQL_PROFILE_TRADES,
         (addr, addr),
     ).fetchall()
     return stats, [t["tag"] for t in tags], pnl, trades
 
 
-def _apply_ui_css() -> None:
-    st.markdown(
-        """
+# Global app CSS as one <style> block.
+_UI_CSS = """
 <style>
   /* Force dark color-scheme everywhere */
   html, body, [data-testid="stAppViewContainer"] { color-scheme: dark; }
@@ -1800,6 +2230,7 @@ def _apply_ui_css() -> None:
     background: linear-gradient(135deg, rgba(124, 58, 237, 0.16), rgba(59, 130, 246, 0.08));
     box-shadow: 0 0 0 1px rgba(61, 68, 82, 0.45), 0 10px 28px rgba(0,0,0,0.35);
   }
+  .feed-grid > .feed-card { margin-bottom: 10px; }
   .feed-header { display: flex; align-items: center; gap: 10px; margin-bottom: 0.4rem; }
   .feed-title { font-weight: 900; }
   .feed-sub { color: rgba(229,231,235,0.75); font-size: 0.92rem; }
@@ -1934,10 +2365,66 @@ def _apply_ui_css() -> None:
   div[data-testid="stDataFrame"] * {
     color: rgba(229,231,235,0.92) !important;
   }
+  /* Table / chat tweaks */
+  .stTable {font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace;}
+  .stChatMessage {border-radius: 10px; margin-bottom: 10px;}
 </style>
-        """,
-        unsafe_allow_html=True,
-    )
+"""
+
+
+def _apply_ui_css() -> None:
+    # Streamlit drops elements that aren't re-emitted on a rerun, so this runs every run.
+    st.markdown(_UI_CSS, unsafe_allow_html=True)
+
+
+# Discover-page CSS (frosted glass card, persona pills, bento tiles).
+_DISCOVER_CSS = """
+<style>
+  /* Frosted glass card (Discover) */
+  .discover-glass {
+    background: rgba(255, 255, 255, 0.05);
+    border: 1px solid rgba(0, 255, 255, 0.20);
+    border-radius: 15px;
+    padding: 18px 18px;
+    box-shadow: 0 4px 30px rgba(0, 0, 0, 0.35);
+    backdrop-filter: blur(6px);
+  }
+  .persona-pill {
+    display: inline-block;
+    padding: 0.22rem 0.60rem;
+    margin: 0 0.40rem 0.40rem 0;
+    border-radius: 999px;
+    border: 1px solid rgba(0, 255, 255, 0.20);
+    background: rgba(0, 255, 255, 0.06);
+    color: rgba(229,231,235,0.92);
+    font-size: 0.90rem;
+    font-weight: 800;
+  }
+  .bento {
+    display: grid;
+    grid-template-columns: 1.4fr 1fr;
+    gap: 12px;
+    margin-top: 12px;
+  }
+  .tile {
+    border: 1px solid #3d4452;
+    border-radius: 12px;
+    padding: 12px 12px;
+    background: rgba(17,24,39,0.45);
+    box-shadow: inset 0 0 0 1px rgba(61,68,82,0.30);
+  }
+  .tile-title { color: rgba(229,231,235,0.70); font-size: 0.78rem; margin-bottom: 0.25rem; }
+  .tile-big { font-size: 1.55rem; font-weight: 900; font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace; }
+  .tile-sub { color: rgba(229,231,235,0.70); margin-top: 0.25rem; font-size: 0.85rem; }
+  .tile-pos { background: rgba(34, 197, 94, 0.10); border-color: rgba(34, 197, 94, 0.25); }
+  .tile-neg { background: rgba(239, 68, 68, 0.10); border-color: rgba(239, 68, 68, 0.25); }
+  .hash-tag { color: rgba(167, 139, 250, 0.95); font-weight: 900; }
+</style>
+"""
+
+
+def _apply_discover_css() -> None:
+    st.markdown(_DISCOVER_CSS, unsafe_allow_html=True)
 
 
 def _copy() -> dict[str, str]:
@@ -1969,29 +2456,622 @@ def _copy() -> dict[str, str]:
     }
 
 
+def _set_lb_page(page: int) -> None:
+    st.session_state["lb_page"] = int(page)
+
+
+@st.fragment
+def _leaderboard_table(
+    df_pool: pd.DataFrame,
+    *,
+    filters_sig: tuple,
+    per_page: int,
+    max_pages: int,
+    show_full_address: bool,
+) -> None:
+    """
+    Paginated leaderboard table. Runs as a fragment so Prev/Next only re-execute this block.
+    """
+    if st.session_state.get("lb_filters_sig") != filters_sig:
+        st.session_state["lb_filters_sig"] = filters_sig
+        st.session_state["lb_page"] = 1
+
+    page = int(st.session_state.get("lb_page") or 1)
+    total_rows = int(len(df_pool)) if not df_pool.empty else 0
+    total_pages = max(1, (total_rows + per_page - 1) // per_page) if total_rows else 1
+    total_pages = min(max_pages, total_pages)
+    page = max(1, min(total_pages, page))
+    st.session_state["lb_page"] = page
+
+    start = (page - 1) * per_page
+    end = start + per_page
+    view = df_pool.iloc[start:end]
+
+    # Leaderboard table (pandas styler), built straight from the page view (no intermediate copies)
+    addr = view["address"].astype("string")
+    sector = view["top_sector"].astype("string").fillna("").replace("", "Other")
+    df_table = pd.DataFrame(
+        {
+            "Rank": np.arange(start + 1, start + 1 + len(view)),
+            "Address": ("👤 " + (addr if show_full_address else _short_addr_col(addr, n=4))).to_numpy(),
+            "sector": ("#" + sector.str.replace(" ", "", regex=False)).to_numpy(),
+            "累计带单收益": view["total_profit_usdc"].to_numpy(),
+            "ROI": view["roi"].to_numpy(),
+            "Win rate": view["win_rate"].to_numpy(),
+            "Markets": view["markets_traded"].to_numpy(),
+            "Trades": view["trades_count"].to_numpy(),
+            "Recent trades": view["recent_trades"].to_numpy(),
+            "Max trade (USDC)": view["max_trade_usdc"].to_numpy(),
+        }
+    )
+
+    def _leaderboard_css(frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Per-cell CSS for the whole table in one vectorized pass.
+        Profit: green/red/neutral text. Win rate: dark-mode gradient 0% deep red -> 100% deep purple.
+        """
+        css = pd.DataFrame("", index=frame.index, columns=frame.columns)
+
+        profit = pd.to_numeric(frame["累计带单收益"], errors="coerce").to_numpy(dtype=np.float64)
+        css["累计带单收益"] = np.where(
+            profit > 0,
+            "color: #10b981; font-weight: 700;",
+            np.where(profit < 0, "color: #f87171; font-weight: 700;", "color: rgba(255,255,255,0.85);"),
+        )
+
+        wr = pd.to_numeric(frame["Win rate"], errors="coerce").to_numpy(dtype=np.float64)
+        x = np.clip(np.nan_to_num(wr, nan=0.0), 0.0, 1.0)
+        lo = np.array([127, 29, 29], dtype=np.float64)  # #7f1d1d
+        hi = np.array([91, 33, 182], dtype=np.float64)  # #5b21b6
+        rgb = (lo + (hi - lo) * x[:, None]).astype(np.int64)
+        hexes = np.char.add(
+            np.char.add(np.char.mod("%02x", rgb[:, 0]), np.char.mod("%02x", rgb[:, 1])),
+            np.char.mod("%02x", rgb[:, 2]),
+        )
+        bg = np.char.add(np.char.add("background-color: #", hexes), "; color: #ffffff; font-weight: 900;")
+        css["Win rate"] = np.where(np.isnan(wr), "", bg)
+        return css
+
+    styler = (
+        df_table.style.format(
+            {
+                "累计带单收益": "{:,.2f}",
+                "ROI": "{:.2f}",
+                "Win rate": "{:.1%}",
+                "Max trade (USDC)": "{:,.2f}",
+            }
+        )
+        .apply(_leaderboard_css, axis=None)
+    )
+    st.dataframe(styler, use_container_width=True, hide_index=True)
+
+    # Pagination controls (below table)
+    p1, p2, p3 = st.columns([1, 1, 4])
+    prev_disabled = page <= 1
+    next_disabled = page >= total_pages
+    # on_click runs before the fragment re-executes, so no explicit st.rerun() is needed
+    p1.button(
+        "← Prev",
+        disabled=prev_disabled,
+        use_container_width=True,
+        key="lb_prev",
+        on_click=_set_lb_page,
+        args=(max(1, page - 1),),
+    )
+    p2.button(
+        "Next →",
+        disabled=next_disabled,
+        use_container_width=True,
+        key="lb_next",
+        on_click=_set_lb_page,
+        args=(min(total_pages, page + 1),),
+    )
+    shown_to = min(end, total_rows) if total_rows else 0
+    shown_from = (start + 1) if total_rows else 0
+    p3.caption(f"Page {page}/{total_pages} · {per_page}/page · showing {shown_from}-{shown_to} of {total_rows}")
+
+
+def _stats_key(stats) -> tuple | None:
+    """
+    Hashable snapshot of a user_stats row (sqlite3.Row or dict) for memoization keys.
+    """
+    if stats is None:
+        return None
+    return tuple((k, stats[k]) for k in stats.keys())
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_style_sentence(
+    address: str,
+    stats_key: tuple | None,
+    tags: tuple[str, ...],
+    *,
+    nonce: int,
+    persona_tone: str = "normal",
+) -> str:
+    stats = dict(stats_key) if stats_key is not None else None
+    return _generate_style_sentence(address, stats, list(tags), nonce=nonce, persona_tone=persona_tone)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_classify_style(stats_key: tuple | None, tags: tuple[str, ...]) -> dict[str, str]:
+    stats = dict(stats_key) if stats_key is not None else None
+    return _classify_style(stats, list(tags))
+
+
+@lru_cache(maxsize=2048)
+def _following_card_html(
+    a: str,
+    show_full_address: bool,
+    stats_key: tuple | None,
+    tags: tuple[str, ...],
+    sectors: tuple[str, ...],
+    buy: float | None,
+) -> str:
+    """
+    Watchlist card HTML. Pure function of its (hashable) inputs, so reruns reuse the rendered string.
+    """
+    s_stats = dict(stats_key) if stats_key is not None else None
+    s_tags = list(tags)
+    sectors = list(sectors) if s_stats is not None else []
+    sector_tags = [f"Sector: {s}" for s in (sectors or [])[:2]]
+    style_tags = _dating_tags(s_stats, s_tags) if s_stats is not None else []
+    card_tags = (style_tags[:6] + sector_tags)[:8]
+    tags_html = "".join([f'<span class="tag">{_esc(t)}</span>' for t in card_tags])
+
+    profit_raw = s_stats["total_profit"] if s_stats is not None else None
+    profit_class = "neu"
+    if profit_raw is not None:
+        try:
+            profit_int = int(profit_raw)
+            if profit_int > 0:
+                profit_class = "pos"
+            elif profit_int < 0:
+                profit_class = "neg"
+        except Exception:
+            profit_class = "neu"
+
+    kv_html = (
+        f'<div class="kv-grid">'
+        f'<div class="kv"><div class="kv-label">Profit (USDC)</div><div class="kv-value {profit_class}">{_esc(_fmt_usdc(s_stats["total_profit"] if s_stats is not None else None))}</div></div>'
+        f'<div class="kv"><div class="kv-label">ROI</div><div class="kv-value">{_esc(_fmt_pct(safe_float(s_stats["roi"]) if s_stats is not None else None))}</div></div>'
+        f'<div class="kv"><div class="kv-label">Win rate</div><div class="kv-value">{_esc(_fmt_pct(safe_float(s_stats["win_rate"]) if s_stats is not None else None))}</div></div>'
+        f'<div class="kv"><div class="kv-label">Markets</div><div class="kv-value">{_esc(safe_int(s_stats["markets_traded"]) if s_stats is not None else 0)}</div></div>'
+        f'<div class="kv"><div class="kv-label">Trades</div><div class="kv-value">{_esc(safe_int(s_stats["trades_count"]) if s_stats is not None else 0)}</div></div>'
+        f'<div class="kv"><div class="kv-label">BUY %</div><div class="kv-value">{_esc(_fmt_pct(buy if s_stats is not None else None))}</div></div>'
+        f'<div class="kv"><div class="kv-label">Max trade</div><div class="kv-value">{_esc(_fmt_usdc(s_stats["max_trade_usdc"] if s_stats is not None else None))}</div></div>'
+        f'<div class="kv"><div class="kv-label">Top sector</div><div class="kv-value">{_esc(sectors[0] if sectors else "n/a")}</div></div>'
+        f'<div class="kv"><div class="kv-label">PFP</div><div class="kv-value">on</div></div>'
+        f"</div>"
+    )
+    persona = ""
+    if s_stats is not None:
+        try:
+            persona = _cached_style_sentence(a, stats_key, tags, nonce=0, persona_tone="normal")
+        except Exception:
+            persona = ""
+
+    alias = _cred_alias(a)
+    handle = _short_addr(a, n=6) if not show_full_address else a
+    return (
+        f'<div class="dating-card">'
+        f'<div class="dating-header">{_pfp_html(a)}'
+        f'<div style="min-width:0">'
+        f'<div class="dating-title"><span class="mono">{_esc(handle)}</span><span class="alias">· {_esc(alias)}</span></div>'
+        f'<div class="dating-sub">{_esc(persona)}</div>'
+        f"</div></div>"
+        f"{tags_html}"
+        f"{kv_html}"
+        f"</div>"
+    )
+
+
+def _following_load_more() -> None:
+    st.session_state["following_visible"] = int(st.session_state.get("following_visible") or 0) + FOLLOWING_PAGE_SIZE
+
+
+@st.fragment
+def _following_cards(
+    db_path: str,
+    *,
+    me_follow: str,
+    followees: list[str],
+    show_full_address: bool,
+    route_key: str,
+    profile_address_key: str,
+) -> None:
+    """
+    Watchlist card grid. Runs as a fragment so "Load more" only re-executes the grid.
+    """
+    c = _copy()
+    c_following, c_profile = c["nav_following"], c["nav_profile"]
+    # Lazy rendering: start with one page of cards, "Load more" appends the next page.
+    visible = int(st.session_state.setdefault("following_visible", FOLLOWING_PAGE_SIZE))
+    shown = followees[:visible]
+    # Prefetch stats/tags, sectors and BUY% for every shown card (a few batched queries, not 3 per card)
+    conn = _get_conn(db_path)
+    profiles = _batch_profile_stats(conn, shown)
+    with_stats = [a for a in shown if profiles.get(a, (None, []))[0] is not None]
+    sectors_by_addr = _batch_top_sectors(conn, with_stats, recent_trades=800, top_k=3)
+    buy_by_addr = _batch_buy_ratio(conn, with_stats, limit=200)
+    cols = st.columns(2)
+    for i, a in enumerate(shown):
+        with cols[i % 2]:
+            s_stats, s_tags = profiles.get(a, (None, []))
+            card = _following_card_html(
+                a,
+                show_full_address,
+                _stats_key(s_stats),
+                tuple(s_tags),
+                tuple(sectors_by_addr.get(a, [])),
+                buy_by_addr.get(a),
+            )
+            st.markdown(card, unsafe_allow_html=True)
+
+            b1, b2 = st.columns(2)
+            if b1.button("查看 Proof (JSON)", use_container_width=True, key=f"following_card_proof_{me_follow}_{a}"):
+                st.session_state["following_proof_addr"] = a
+                st.session_state["following_proof_from"] = c_following
+                st.rerun()
+            if b2.button("进入 Profile", use_container_width=True, key=f"following_card_profile_{me_follow}_{a}"):
+                st.session_state["route_prev"] = st.session_state.get(route_key, c_following)
+                st.session_state[route_key] = c_profile
+                st.session_state[profile_address_key] = a
+                st.rerun()
+            if st.button("Unfollow", type="secondary", use_container_width=True, key=f"following_card_unfollow_{me_follow}_{a}"):
+                _unfollow(conn, follower=me_follow, followee=a)
+                st.rerun()
+
+            # Inline proof panel for the last clicked address
+            if st.session_state.get("following_proof_addr") == a:
+                recent = _fetch_recent_trades_for_address(conn, a, limit=1)
+                if recent:
+                    tx = str(recent[0].get("tx_hash") or "")
+                    st.caption(f"Latest proof · tx `{_short_addr(tx, n=10)}`")
+                    decoded = recent[0].get("decoded_json")
+                    if decoded:
+                        parsed = _parse_decoded(str(decoded))
+                        if parsed is not None:
+                            st.json(parsed)
+                        else:
+                            st.code(str(decoded))
+                else:
+                    st.caption("(no trades found for proof)")
+            _vspace(14)
+
+    if len(followees) > visible:
+        l1, l2 = st.columns([1, 3])
+        l1.button("Load more", use_container_width=True, key="following_load_more", on_click=_following_load_more)
+        l2.caption(f"Showing {len(shown)} of {len(followees)}")
+
+
+@st.fragment
+def _following_feed(db_path: str, *, me_follow: str, followees: list[str], show_full_address: bool) -> None:
+    """
+    Whale feed for the current watchlist. Runs as a fragment so filter/view changes only re-execute this block.
+    """
+    f1, f2, f3 = st.columns([2, 1, 1])
+    with f1:
+        followee_filter = st.selectbox("Followee", options=["(all)"] + followees, index=0)
+    with f2:
+        side_filter = st.selectbox("Side", options=["(all)", "BUY", "SELL"], index=0)
+    with f3:
+        feed_limit = st.slider("Feed size", min_value=10, max_value=200, value=50, step=10)
+
+    view_mode = st.radio(
+        "View",
+        options=["Notes", "Log", "Cards", "Table"],
+        horizontal=True,
+        index=0,
+        key="following_feed_view",
+    )
+
+    feed = _cached_follow_feed(
+        db_path,
+        me_follow,
+        int(feed_limit),
+        (None if followee_filter == "(all)" else str(followee_filter)),
+        (None if side_filter == "(all)" else str(side_filter)),
+    )
+    if not feed:
+        st.write("(no trades found yet — make sure you have backfilled trades)")
+    else:
+        # Feed rows are plain dicts with every selected column present; format shared fields once.
+        rows = feed[: int(feed_limit)]
+        amounts = [_fmt_usdc(t["collateral_amount"]) for t in rows]
+        # Followees repeat across rows: shorten each distinct address once for the Notes/Log text.
+        handles = {f: _short_addr(f, n=4) for f in {str(t["followee"] or "") for t in rows}}
+        if view_mode == "Notes":
+            for t, amount in zip(rows, amounts):
+                followee, slug, question, tx, log_index = (
+                    str(t["followee"] or ""),
+                    str(t["slug"] or "n/a"),
+                    str(t["question"] or "").strip(),
+                    str(t["tx_hash"] or ""),
+                    t["log_index"],
+                )
+                market = question or slug
+
+                with st.chat_message("user"):
+                    st.markdown(
+                        f"博主 **{handles[followee]}** 刚刚发布了一笔新『笔记』：在 **{_esc(market)}** 投入了 **{amount} USDC**。",
+                        unsafe_allow_html=True,
+                    )
+                    if st.button(
+                        "查看原始凭证",
+                        key=f"following_proof_btn_{tx}_{log_index}_{followee}",
+                        use_container_width=False,
+                    ):
+                        st.markdown(f"[Verify on Explorer]({t['tx_url']})")
+            _vspace(8)
+        elif view_mode == "Log":
+            lines = []
+            for t, collateral in zip(rows, amounts):
+                followee, side, question, slug = (
+                    str(t["followee"] or ""),
+                    str(t["side"] or ""),
+                    str(t["question"] or "").strip(),
+                    str(t["slug"] or "n/a"),
+                )
+                hhmmss = _fmt_hms_from_ts(safe_int(t["timestamp"], 0))
+                title = question or slug
+                emoji = "🟢" if side == "BUY" else ("🔴" if side == "SELL" else "🟣")
+                whale = "🐋"
+                addr_disp = handles[followee]
+                lines.append(f"[{hhmmss}] {whale} {addr_disp} 刚刚 {emoji} {side or 'TRADE'} 了 “{title}” | {collateral} USDC")
+            st.markdown(f"<div class='log-box'>{_esc(chr(10).join(lines))}</div>", unsafe_allow_html=True)
+        elif view_mode == "Cards":
+            # One markdown element for the whole feed; card spacing comes from the .feed-grid CSS rule.
+            cards = []
+            for t, collateral in zip(rows, amounts):
+                followee = str(t["followee"] or "")
+                side = str(t["side"] or "")
+                slug = str(t["slug"] or "n/a")
+                sector = _sector_for_market_text(f"{slug} {t['question'] or ''}")
+                side_cls = "pill-buy" if side == "BUY" else ("pill-sell" if side == "SELL" else "")
+                pm_url = t["pm_url"]
+                cards.append(
+                    _FEED_CARD_TEMPLATE.format_map(
+                        {
+                            "pfp": _pfp_html(followee),
+                            "handle": _esc(followee if show_full_address else t["followee_short"]),
+                            "side_pill": f'<span class="pill {side_cls}">{_esc(side or "n/a")}</span>',
+                            "sector_pill": f'<span class="pill">{_esc(sector)}</span>',
+                            "block": _esc(t["block_number"]),
+                            "collateral": _esc(collateral),
+                            "price": _esc(t["price"]),
+                            "market_html": (
+                                f'<a href="{pm_url}" target="_blank">{_esc(slug)}</a>' if pm_url else _esc(slug)
+                            ),
+                            "market_id": _esc(str(t["market_id"] or "") or "n/a"),
+                            "outcome": _esc(str(t["outcome_label"] or "n/a")),
+                            "tx_url": t["tx_url"],
+                            "tx_short": _esc(t["tx_short"]),
+                        }
+                    )
+                )
+            st.markdown(f'<div class="feed-grid">{"".join(cards)}</div>', unsafe_allow_html=True)
+        else:
+            # Column-wise: one list per needed field (no per-row dict unpacking), derived columns
+            # via pandas string ops.
+            raw = pd.DataFrame(
+                {
+                    k: [t[k] for t in feed]
+                    for k in (
+                        "block_number", "followee", "followee_short", "side", "market_id", "slug", "question",
+                        "outcome_label", "collateral_amount", "price", "pm_url", "tx_url",
+                    )
+                }
+            )
+
+            def _text(col: str, default: str) -> pd.Series:
+                return raw[col].astype("string").fillna("").replace("", default)
+
+            slug = _text("slug", "n/a")
+            question = _text("question", "")
+            market_text = slug + " " + question  # classified once per distinct market below
+            df_feed = pd.DataFrame(
+                {
+                    "block": raw["block_number"],
+                    "followee": _text("followee", "") if show_full_address else _text("followee_short", ""),
+                    "side": raw["side"],
+                    "sector": market_text.map({k: _sector_for_market_text(k) for k in market_text.unique()}),
+                    "market_id": _text("market_id", "n/a"),
+                    "slug": slug,
+                    "outcome": _text("outcome_label", "n/a"),
+                    "collateral_usdc": pd.to_numeric(raw["collateral_amount"], errors="coerce") / (10**USDC_DECIMALS),
+                    "price": raw["price"],
+                    "pm": _text("pm_url", ""),
+                    "tx": _text("tx_url", ""),
+                }
+            )
+            st.dataframe(
+                df_feed,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "pm": st.column_config.LinkColumn("pm", display_text="market"),
+                    "tx": st.column_config.LinkColumn("tx", display_text="view"),
+                },
+            )
+
+
+def _discover_next(idx: int) -> None:
+    st.session_state["discover_target_idx"] = int(idx) + 1
+
+
+def _discover_follow(db_path: str, follower: str, followee: str, idx: int) -> None:
+    conn = _get_conn(db_path)
+    _follow(conn, follower=follower, followee=followee)
+    _upsert_swipe(conn, from_addr=follower, to_addr=followee, action="follow")
+    st.session_state["discover_toast"] = "已成功订阅该博主动态"
+    _discover_next(idx)
+
+
+@st.fragment
+def _discover_card(db_path: str, *, follower_id: str, show_full_address: bool, data_version: int) -> None:
+    """
+    Current Discover target card, its actions and the follow list. Runs as a fragment so
+    Skip/Follow only re-execute this block (not the whole page).
+    """
+    conn = _get_conn(db_path)
+
+    # Optional toast (e.g. follow confirmation)
+    toast_msg = st.session_state.pop("discover_toast", None)
+    if toast_msg:
+        try:
+            st.toast(str(toast_msg), icon="✅")
+        except Exception:
+            pass
+
+    idx = safe_int(st.session_state.get("discover_target_idx", 0))
+    targets = st.session_state.get("discover_targets") or []
+    if not targets:
+        st.info("还没有目标卡片。点上方 “✨ 换一批潜在目标”。")
+    elif idx >= len(targets):
+        st.success("这一批刷完了。点 “✨ 换一批潜在目标”。")
+    else:
+        addr = str(targets[idx])
+        # Card data for the whole batch is prefetched once (per target list / DB version)
+        # and kept in session state; Skip/Follow reruns then render without SQL.
+        cache_key = (tuple(targets), data_version)
+        cache = st.session_state.get("discover_target_cache")
+        if not cache or cache.get("key") != cache_key:
+            cache = {"key": cache_key, "cards": _batch_discover_cards(conn, [str(t) for t in targets])}
+            st.session_state["discover_target_cache"] = cache
+        card = cache["cards"].get(_norm_addr(addr))
+        if card is None:
+            card = _batch_discover_cards(conn, [addr]).get(_norm_addr(addr), {})
+        stats = card.get("stats")
+        score = card.get("score", 0)
+        handle = _short_addr(addr, n=6) if not show_full_address else addr
+        alias = _cred_alias(addr)
+        personas = card["personas"] if "personas" in card else ["🧩 Unknown"]
+        intro = card["intro"] if "intro" in card else _blogger_intro(stats)
+
+        buy_pct = card.get("buy_pct")
+        avg_size = card.get("avg_size")
+        sectors = card.get("sectors") or []
+        profit_usdc = _to_usdc(safe_int(stats["total_profit"], 0)) if stats is not None else None
+        profit_tile_cls = "tile-pos" if (profit_usdc is not None and profit_usdc > 0) else ("tile-neg" if (profit_usdc is not None and profit_usdc < 0) else "")
+
+        # Card (social-note style): container + intro + bento
+        with st.container(border=True):
+            st.markdown(
+                f"""
+<div class="discover-glass">
+  <div style="display:flex; align-items:center; gap:12px;">
+    {_pfp_html(addr)}
+    <div style="min-width:0;">
+      <div style="font-weight:900; font-size:1.15rem;">
+        <span class="mono">{_esc(handle)}</span>
+        <span class="alias">· {_esc(alias)}</span>
+        <span class="muted" style="margin-left:0.6rem;">Signal {score}</span>
+      </div>
+      <div style="margin-top:0.55rem;">
+        {" ".join([f'<span class="persona-pill">{_esc(p)}</span>' for p in personas])}
+      </div>
+      <div class="muted" style="margin-top:0.45rem;">{_esc(intro)}</div>
+    </div>
+  </div>
+  <div class="bento">
+    <div class="tile {profit_tile_cls}">
+      <div class="tile-title">PnL</div>
+      <div class="tile-big">{_esc("n/a" if profit_usdc is None else f"{profit_usdc:,.2f} USDC")}</div>
+      <div class="tile-sub">ROI: {_esc(_fmt_pct(safe_float(stats["roi"]) if stats is not None else None))} · Win: {_esc(_fmt_pct(safe_float(stats["win_rate"]) if stats is not None else None))}</div>
+    </div>
+    <div class="tile">
+      <div class="tile-title">Behavior</div>
+      <div class="tile-sub">BUY%: <span class="mono">{_esc(_fmt_pct(buy_pct))}</span></div>
+      <div class="tile-sub">Avg Size: <span class="mono">{_esc("n/a" if avg_size is None else f"{avg_size:,.2f} USDC")}</span></div>
+    </div>
+    <div class="tile" style="grid-column: 1 / span 2;">
+      <div class="tile-title">Specialty</div>
+      <div class="tile-sub">
+        {" ".join([f'<span class="hash-tag">#{_esc(s)}</span>' for s in (sectors or ["Other"])])}
+      </div>
+    </div>
+  </div>
+</div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+        _vspace(10)
+        with st.expander("🔍 查看链上原始证据"):
+            st.caption("每条记录都可点击 Explorer 验证（来源：Polygon `eth_getLogs` 解码）。")
+            lines = card.get("proof_lines") or []
+            if not lines:
+                st.write("(no trades found)")
+            for it in lines:
+                tx = it["tx"]
+                st.markdown(
+                    f"- <span class='muted'>Block #{_esc(it['block'])} | {_esc(it['collateral'])} USDC | Prediction: {_esc(it['prediction'])}</span> · "
+                    f"[Verify on Explorer]({_polygonscan_tx_url(tx)})",
+                    unsafe_allow_html=True,
+                )
+
+        _vspace(10)
+        b1, b2, b3 = st.columns([1, 1, 1])
+        b1.button(
+            "⛔ Skip (Next)",
+            use_container_width=True,
+            key=f"discover_skip_{addr}_{idx}",
+            on_click=_discover_next,
+            args=(idx,),
+        )
+        b2.button(
+            "💜 Follow",
+            type="primary",
+            use_container_width=True,
+            key=f"discover_follow_{addr}_{idx}",
+            disabled=not bool(follower_id),
+            on_click=_discover_follow,
+            args=(db_path, follower_id, addr, idx),
+        )
+        if b3.button("👤 进入 Profile", use_container_width=True, key=f"discover_profile_{addr}_{idx}"):
+            st.session_state["dating_profile_jump"] = addr
+            st.rerun()
+
+        following_count = len(_cached_followees(db_path, follower_id, 500)) if follower_id else 0
+        st.caption(f"Batch progress: {idx+1}/{len(targets)} · Following: {following_count}")
+
+    with st.expander("My Follows (from Discover)"):
+        if not follower_id:
+            st.write("Follow identity missing.")
+        else:
+            followees = _cached_followees(db_path, follower_id, 200)
+            if not followees:
+                st.write("(empty) Tap Follow on a card above.")
+            else:
+                st.caption("Tip: the full trade feed is on the `Following` page.")
+                for a in followees:
+                    cols = st.columns([3, 1, 1])
+                    cols[0].write(a if show_full_address else _short_addr(a))
+                    if cols[1].button("Profile", key=f"dating_follow_profile_{follower_id}_{a}"):
+                        st.session_state["dating_profile_jump"] = a
+                        st.rerun()
+                    if cols[2].button("Unfollow", key=f"dating_unfollow_{follower_id}_{a}"):
+                        _unfollow(conn, follower=follower_id, followee=a)
+                        st.rerun()
+
+
 def main() -> None:
     st.set_page_config(page_title="PolyBook", layout="wide", initial_sidebar_state="expanded")
     _apply_ui_css()
-    st.markdown(
-        """
-    <style>
-    .stTable {font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace;}
-    .stChatMessage {border-radius: 10px; margin-bottom: 10px;}
-    </style>
-        """,
-        unsafe_allow_html=True,
-    )
 
     db_path = _load_db_path()
-    # Ensure schema exists (including Dating tables). Safe and idempotent.
-    init_db(db_path)
-    conn = connect(db_path)
+    conn = _get_conn(db_path)
+    data_version = read_data_version(conn)
 
     # Sidebar controls
     st.sidebar.title("📖 PolyBook")
     st.sidebar.caption("记录链上 Alpha 的种草笔记")
     st.sidebar.caption("🟢 Real-time Indexing...")
     show_full_address = st.sidebar.checkbox("地址显示完整", value=True)
+    if st.sidebar.button("🔄 Refresh data", use_container_width=True, key="sidebar_refresh_data"):
+        # Drop cached query results (e.g. after a backfill / compute run).
+        st.cache_data.clear()
     c = _copy()
 
     # Routing
@@ -2071,57 +3151,32 @@ def main() -> None:
 
         # Fetch a larger pool, then segment (so "top by sector/tag" makes sense)
         pool = int(scan_depth or 500)
-        df_pool = _fetch_leaderboard(conn, sort=sort, limit=pool, required_tags=None)
-
-        # Time window filter (activity-based): keep only addresses that traded recently (timestamp-based)
-        anchor_ts = _latest_trade_ts(conn)
+        # Time window filter (activity-based): the pool query keeps only addresses that traded recently
+        anchor_ts = _cached_latest_trade_ts(db_path, data_version)
         if anchor_ts <= 0:
             anchor_ts = int(time.time())
         start_ts = _window_start_ts(time_window, anchor_ts=anchor_ts)
-        recent_counts: dict[str, int] = {}
-        if start_ts is not None:
-            recent_counts = _recent_trade_counts(conn, start_ts=start_ts)
-        if not df_pool.empty:
-            df_pool = df_pool.copy()
-            if start_ts is not None:
-                df_pool["recent_trades"] = df_pool["address"].map(lambda a: int(recent_counts.get(str(a).lower(), 0)))
-                df_pool = df_pool[df_pool["recent_trades"] > 0].copy()
-            else:
-                df_pool["recent_trades"] = 0
-        if not df_pool.empty:
-            df_pool = df_pool.copy()
-            df_pool["top_sector"] = df_pool["address"].apply(
-                lambda a: (_top_sectors_for_address(conn, a, recent_trades=600, top_k=1) or ["Other"])[0]
-            )
 
-        # Quick search (filters pool + table in realtime)
+        # Quick search (filters pool + table in realtime; applied in the pool query)
         q = st.text_input("🔍 Quick Search Address", value="", placeholder="0x1234...abcd", key="lb_search")
-        if q and not df_pool.empty:
-            q_l = q.strip().lower()
-            df_pool = df_pool[df_pool["address"].astype(str).str.lower().str.contains(q_l)].copy()
+        df_pool = _cached_leaderboard_pool(
+            db_path, sort, pool, (int(start_ts) if start_ts is not None else None), (q or "").strip().lower(), data_version
+        )
+        if not df_pool.empty:
+            df_pool = df_pool.copy()
+            addrs_l = df_pool["address"].astype(str).str.lower()
+            sector_map = _cached_top_sector_map(db_path, tuple(addrs_l), 600, data_version)
+            df_pool["top_sector"] = addrs_l.map(sector_map).fillna("Other")
 
-        # Pagination state (table-only; no page selector in header)
+        # Filter signature: the table fragment resets to page 1 when it changes
         filters_sig = (
             str(sort),
             int(pool),
             str(time_window),
             str(q or ""),
         )
-        if st.session_state.get("lb_filters_sig") != filters_sig:
-            st.session_state["lb_filters_sig"] = filters_sig
-            st.session_state["lb_page"] = 1
-
-        page = int(st.session_state.get("lb_page") or 1)
         total_rows = int(len(df_pool)) if not df_pool.empty else 0
-        total_pages = max(1, (total_rows + PER_PAGE - 1) // PER_PAGE) if total_rows else 1
-        total_pages = min(MAX_PAGES, total_pages)
-        page = max(1, min(total_pages, page))
-        st.session_state["lb_page"] = page
-
-        start = (page - 1) * PER_PAGE
-        end = start + PER_PAGE
-        df = df_pool.iloc[start:end].copy() if not df_pool.empty else df_pool
-        if not df.empty:
+        if not df_pool.empty:
             toast_sig = (str(sort), str(time_window), int(pool), int(total_rows))
             if st.session_state.get("lb_toast_sig") != toast_sig:
                 st.session_state["lb_toast_sig"] = toast_sig
@@ -2130,29 +3185,33 @@ def main() -> None:
                 except Exception:
                     pass
 
-            # Dashboard charts (based on the segmented pool)
-            dash = df_pool.copy()
-            if not dash.empty:
-                dash["profit (USDC)"] = dash["total_profit_usdc"]
-                dash["roi"] = dash["roi"]
+            # Dashboard charts (based on the segmented pool): one groupby feeds both pies
+            if not df_pool.empty:
+                agg = (
+                    df_pool.groupby("top_sector", as_index=False, sort=False)
+                    .agg(addresses=("address", "size"), profit_sum=("total_profit_usdc", "sum"))
+                    .rename(columns={"top_sector": "sector"})
+                )
+                # Pie charts can't show negative values; use absolute profit magnitude for "share".
+                agg["profit_abs"] = agg["profit_sum"].abs()
 
                 s1, s2 = st.columns(2)
                 with s1:
-                    sec_counts = dash["top_sector"].value_counts().rename_axis("sector").reset_index(name="addresses")
                     st.caption("Addresses by sector (segmented pool)")
-                    _pie_chart(sec_counts, label_col="sector", value_col="addresses", title="Addresses by sector")
-                with s2:
-                    sec_profit = (
-                        dash.groupby("top_sector", as_index=False)["profit (USDC)"]
-                        .sum()
-                        .sort_values("profit (USDC)", ascending=False)
-                        .rename(columns={"top_sector": "sector", "profit (USDC)": "profit_sum"})
+                    _pie_chart(
+                        agg[["sector", "addresses"]].sort_values("addresses", ascending=False, kind="stable"),
+                        label_col="sector",
+                        value_col="addresses",
+                        title="Addresses by sector",
                     )
+                with s2:
                     st.caption("Profit sum by sector (segmented pool)")
-                    sec_profit = sec_profit.copy()
-                    # Pie charts can't show negative values; use absolute profit magnitude for "share".
-                    sec_profit["profit_abs"] = sec_profit["profit_sum"].abs()
-                    _pie_chart(sec_profit, label_col="sector", value_col="profit_abs", title="Profit share by sector (abs)")
+                    _pie_chart(
+                        agg[["sector", "profit_sum", "profit_abs"]].sort_values("profit_sum", ascending=False, kind="stable"),
+                        label_col="sector",
+                        value_col="profit_abs",
+                        title="Profit share by sector (abs)",
+                    )
 
                 # Extra visuals under the pies
                 # Charts follow the selected time window; for "All time" show the most recent 30d for readability.
@@ -2163,15 +3222,15 @@ def main() -> None:
                 c1, c2 = st.columns(2)
                 with c1:
                     st.caption(f"Top markets (since {chart_start_label} UTC)")
-                    topm = _top_markets_in_window(conn, start_ts=int(chart_start_ts), limit=12)
+                    topm = _cached_top_markets_in_window(db_path, int(chart_start_ts), 12, data_version)
                     if not topm.empty:
                         topm = topm.copy()
-                        topm["label"] = topm["slug"].map(lambda s: _truncate_label(str(s), 15))
+                        topm["label"] = _truncate_label_col(topm["slug"], 15)
                         _barh_chart(topm[["label", "trades"]], label_col="label", value_col="trades", title="Top markets")
                 with c2:
                     unit = "hour" if int(bucket_seconds) == 3600 else "day"
                     st.caption(f"Trading Volume (count per {unit})")
-                    df_vol = _trading_volume_by_period(conn, start_ts=int(chart_start_ts), bucket_seconds=int(bucket_seconds))
+                    df_vol = _cached_trading_volume_by_period(db_path, int(chart_start_ts), int(bucket_seconds), data_version)
                     if df_vol is not None and not df_vol.empty:
                         st.bar_chart(df_vol, height=250)
                     else:
@@ -2202,87 +3261,14 @@ def main() -> None:
                     st.session_state[profile_address_key] = chosen
                     st.rerun()
 
-            # Leaderboard table (pandas styler)
-            df_table = df.copy()
-            df_table.insert(0, "rank", list(range(start + 1, start + 1 + len(df_table))))
-            df_table["address_display"] = df_table["address"].apply(
-                lambda a: ("👤 " + (str(a) if show_full_address else _short_addr(str(a), n=4)))
-            )
-            df_table["sector"] = df_table["top_sector"].apply(lambda s: f"#{(str(s or 'Other')).replace(' ', '')}")
-            df_table = df_table.rename(
-                columns={
-                    "address_display": "Address",
-                    "total_profit_usdc": "累计带单收益",
-                    "roi": "ROI",
-                    "win_rate": "Win rate",
-                    "markets_traded": "Markets",
-                    "trades_count": "Trades",
-                    "recent_trades": "Recent trades",
-                    "max_trade_usdc": "Max trade (USDC)",
-                    "rank": "Rank",
-                }
-            )
-            df_table = df_table[
-                ["Rank", "Address", "sector", "累计带单收益", "ROI", "Win rate", "Markets", "Trades", "Recent trades", "Max trade (USDC)"]
-            ].copy()
-
-            def _profit_style(v):
-                try:
-                    v = float(v)
-                except Exception:
-                    return ""
-                if v > 0:
-                    return "color: #10b981; font-weight: 700;"
-                if v < 0:
-                    return "color: #f87171; font-weight: 700;"
-                return "color: rgba(255,255,255,0.85);"
-
-            def _win_rate_gradient_bg(v):
-                """
-                Dark-mode gradient: 0% deep red -> 100% deep purple.
-                """
-                try:
-                    x = float(v)
-                except Exception:
-                    return ""
-                if x != x:  # NaN
-                    return ""
-                x = max(0.0, min(1.0, x))
-                lo = (127, 29, 29)  # #7f1d1d
-                hi = (91, 33, 182)  # #5b21b6
-                r = int(lo[0] + (hi[0] - lo[0]) * x)
-                g = int(lo[1] + (hi[1] - lo[1]) * x)
-                b = int(lo[2] + (hi[2] - lo[2]) * x)
-                bg = f"#{r:02x}{g:02x}{b:02x}"
-                return f"background-color: {bg}; color: #ffffff; font-weight: 900;"
-
-            styler = (
-                df_table.style.format(
-                    {
-                        "累计带单收益": "{:,.2f}",
-                        "ROI": "{:.2f}",
-                        "Win rate": "{:.1%}",
-                        "Max trade (USDC)": "{:,.2f}",
-                    }
-                )
-                .applymap(_profit_style, subset=["累计带单收益"])
-                .applymap(_win_rate_gradient_bg, subset=["Win rate"])
+            # Leaderboard table + pagination rerun as a fragment (Prev/Next don't re-run the page)
+            _leaderboard_table(
+                df_pool,
+                filters_sig=filters_sig,
+                per_page=PER_PAGE,
+                max_pages=MAX_PAGES,
+                show_full_address=show_full_address,
             )
-            st.dataframe(styler, use_container_width=True, hide_index=True)
-
-            # Pagination controls (below table)
-            p1, p2, p3 = st.columns([1, 1, 4])
-            prev_disabled = page <= 1
-            next_disabled = page >= total_pages
-            if p1.button("← Prev", disabled=prev_disabled, use_container_width=True, key="lb_prev"):
-                st.session_state["lb_page"] = max(1, page - 1)
-                st.rerun()
-            if p2.button("Next →", disabled=next_disabled, use_container_width=True, key="lb_next"):
-                st.session_state["lb_page"] = min(total_pages, page + 1)
-                st.rerun()
-            shown_to = min(end, total_rows) if total_rows else 0
-            shown_from = (start + 1) if total_rows else 0
-            p3.caption(f"Page {page}/{total_pages} · {PER_PAGE}/page · showing {shown_from}-{shown_to} of {total_rows}")
         else:
             st.info("暂无榜单数据：请先运行 `python -m src.main compute`。")
 
@@ -2314,7 +3300,7 @@ def main() -> None:
                 )
 
         me_follow = _norm_addr(st.session_state.get(follow_me_key, "") or "")
-        followees = _fetch_followees(conn, me_follow, limit=500) if me_follow else []
+        followees = _cached_followees(db_path, me_follow, 500) if me_follow else []
 
         m1, m2, m3 = st.columns(3)
         m1.metric("Following", len(followees))
@@ -2340,103 +3326,14 @@ def main() -> None:
         elif not followees:
             st.write("(empty) Follow someone from Leaderboard / Discover, or add above.")
         else:
-            if len(followees) <= 1:
-                show_n = len(followees)
-            else:
-                show_n = st.slider(
-                    "Show cards",
-                    min_value=1,
-                    max_value=min(50, len(followees)),
-                    value=min(12, len(followees)),
-                    step=1,
-                    key="following_show_cards",
-                )
-            cols = st.columns(2)
-            for i, a in enumerate(followees[: int(show_n)]):
-                with cols[i % 2]:
-                    s_stats, s_tags = _fetch_profile_stats(conn, a)
-                    sectors = _top_sectors_for_address(conn, a, recent_trades=800, top_k=3) if s_stats is not None else []
-                    sector_tags = [f"Sector: {s}" for s in (sectors or [])[:2]]
-                    style_tags = _dating_tags(s_stats, s_tags) if s_stats is not None else []
-                    card_tags = (style_tags[:6] + sector_tags)[:8]
-                    tags_html = "".join([f'<span class="tag">{_esc(t)}</span>' for t in card_tags])
-
-                    profit_raw = s_stats["total_profit"] if s_stats is not None else None
-                    profit_class = "neu"
-                    if profit_raw is not None:
-                        try:
-                            profit_int = int(profit_raw)
-                            if profit_int > 0:
-                                profit_class = "pos"
-                            elif profit_int < 0:
-                                profit_class = "neg"
-                        except Exception:
-                            profit_class = "neu"
-
-                    kv_html = (
-                        f'<div class="kv-grid">'
-                        f'<div class="kv"><div class="kv-label">Profit (USDC)</div><div class="kv-value {profit_class}">{_esc(_fmt_usdc(s_stats["total_profit"] if s_stats is not None else None))}</div></div>'
-                        f'<div class="kv"><div class="kv-label">ROI</div><div class="kv-value">{_esc(_fmt_pct(_safe_float(s_stats["roi"]) if s_stats is not None else None))}</div></div>'
-                        f'<div class="kv"><div class="kv-label">Win rate</div><div class="kv-value">{_esc(_fmt_pct(_safe_float(s_stats["win_rate"]) if s_stats is not None else None))}</div></div>'
-                        f'<div class="kv"><div class="kv-label">Markets</div><div class="kv-value">{_esc(_safe_int(s_stats["markets_traded"]) if s_stats is not None else 0)}</div></div>'
-                        f'<div class="kv"><div class="kv-label">Trades</div><div class="kv-value">{_esc(_safe_int(s_stats["trades_count"]) if s_stats is not None else 0)}</div></div>'
-                        f'<div class="kv"><div class="kv-label">BUY %</div><div class="kv-value">{_esc(_fmt_pct(_buy_ratio(conn, a, limit=200) if s_stats is not None else None))}</div></div>'
-                        f'<div class="kv"><div class="kv-label">Max trade</div><div class="kv-value">{_esc(_fmt_usdc(s_stats["max_trade_usdc"] if s_stats is not None else None))}</div></div>'
-                        f'<div class="kv"><div class="kv-label">Top sector</div><div class="kv-value">{_esc(sectors[0] if sectors else "n/a")}</div></div>'
-                        f'<div class="kv"><div class="kv-label">PFP</div><div class="kv-value">on</div></div>'
-                        f"</div>"
-                    )
-                    persona = ""
-                    if s_stats is not None:
-                        try:
-                            persona = _generate_style_sentence(a, s_stats, s_tags, nonce=0, persona_tone="normal")
-                        except Exception:
-                            persona = ""
-
-                    alias = _cred_alias(a)
-                    handle = _short_addr(a, n=6) if not show_full_address else a
-                    card = (
-                        f'<div class="dating-card">'
-                        f'<div class="dating-header">{_pfp_html(a)}'
-                        f'<div style="min-width:0">'
-                        f'<div class="dating-title"><span class="mono">{_esc(handle)}</span><span class="alias">· {_esc(alias)}</span></div>'
-                        f'<div class="dating-sub">{_esc(persona)}</div>'
-                        f"</div></div>"
-                        f"{tags_html}"
-                        f"{kv_html}"
-                        f"</div>"
-                    )
-                    st.markdown(card, unsafe_allow_html=True)
-
-                    b1, b2 = st.columns(2)
-                    if b1.button("查看 Proof (JSON)", use_container_width=True, key=f"following_card_proof_{me_follow}_{a}"):
-                        st.session_state["following_proof_addr"] = a
-                        st.session_state["following_proof_from"] = c["nav_following"]
-                        st.rerun()
-                    if b2.button("进入 Profile", use_container_width=True, key=f"following_card_profile_{me_follow}_{a}"):
-                        st.session_state["route_prev"] = st.session_state.get(route_key, c["nav_following"])
-                        st.session_state[route_key] = c["nav_profile"]
-                        st.session_state[profile_address_key] = a
-                        st.rerun()
-                    if st.button("Unfollow", type="secondary", use_container_width=True, key=f"following_card_unfollow_{me_follow}_{a}"):
-                        _unfollow(conn, follower=me_follow, followee=a)
-                        st.rerun()
-
-                    # Inline proof panel for the last clicked address
-                    if st.session_state.get("following_proof_addr") == a:
-                        recent = _fetch_recent_trades_for_address(conn, a, limit=1)
-                        if recent:
-                            tx = str(recent[0].get("tx_hash") or "")
-                            st.caption(f"Latest proof · tx `{_short_addr(tx, n=10)}`")
-                            decoded = recent[0].get("decoded_json")
-                            if decoded:
-                                try:
-                                    st.json(json.loads(str(decoded)))
-                                except Exception:
-                                    st.code(str(decoded))
-                        else:
-                            st.caption("(no trades found for proof)")
-                    _vspace(14)
+            _following_cards(
+                db_path,
+                me_follow=me_follow,
+                followees=followees,
+                show_full_address=show_full_address,
+                route_key=route_key,
+                profile_address_key=profile_address_key,
+            )
 
         _vspace(10)
         st.markdown("#### 最近成交动态 (Whale feed)")
@@ -2445,142 +3342,8 @@ def main() -> None:
         elif not followees:
             st.info("Your watchlist is empty. Add some followees above.")
         else:
-            f1, f2, f3 = st.columns([2, 1, 1])
-            with f1:
-                followee_filter = st.selectbox("Followee", options=["(all)"] + followees, index=0)
-            with f2:
-                side_filter = st.selectbox("Side", options=["(all)", "BUY", "SELL"], index=0)
-            with f3:
-                feed_limit = st.slider("Feed size", min_value=10, max_value=200, value=50, step=10)
-
-            view_mode = st.radio(
-                "View",
-                options=["Notes", "Log", "Cards", "Table"],
-                horizontal=True,
-                index=0,
-                key="following_feed_view",
-            )
-
-            feed = _fetch_follow_feed(
-                conn,
-                me_follow,
-                limit=int(feed_limit),
-                followee=(None if followee_filter == "(all)" else str(followee_filter)),
-                side=(None if side_filter == "(all)" else str(side_filter)),
-            )
-            if not feed:
-                st.write("(no trades found yet — make sure you have backfilled trades)")
-            else:
-                if view_mode == "Notes":
-                    for t in feed[: int(feed_limit)]:
-                        followee = str(_row_get(t, "followee", "") or "")
-                        slug = str(_row_get(t, "slug", "n/a") or "n/a")
-                        question = str(_row_get(t, "question", "") or "")
-                        market = question.strip() if question.strip() else slug
-                        amount = _fmt_usdc(_row_get(t, "collateral_amount"))
-                        tx = str(_row_get(t, "tx_hash", "") or "")
-
-                        with st.chat_message("user"):
-                            st.markdown(
-                                f"博主 **{_short_addr(followee, n=4)}** 刚刚发布了一笔新『笔记』：在 **{_esc(market)}** 投入了 **{amount} USDC**。",
-                                unsafe_allow_html=True,
-                            )
-                            if st.button(
-                                "查看原始凭证",
-                                key=f"following_proof_btn_{tx}",
-                                use_container_width=False,
-                            ):
-                                st.markdown(f"[Verify on Explorer]({_polygonscan_tx_url(tx)})")
-                    _vspace(8)
-                elif view_mode == "Log":
-                    lines = []
-                    for t in feed[: int(feed_limit)]:
-                        ts = _safe_int(_row_get(t, "timestamp"), 0)
-                        hhmmss = _fmt_hms_from_ts(ts)
-                        followee = str(_row_get(t, "followee", "") or "")
-                        side = str(_row_get(t, "side", "") or "")
-                        question = str(_row_get(t, "question", "") or "")
-                        slug = str(_row_get(t, "slug", "n/a") or "n/a")
-                        title = question.strip() if question.strip() else slug
-                        collateral = _fmt_usdc(_row_get(t, "collateral_amount"))
-                        emoji = "🟢" if side == "BUY" else ("🔴" if side == "SELL" else "🟣")
-                        whale = "🐋"
-                        addr_disp = _short_addr(followee, n=4)
-                        lines.append(f"[{hhmmss}] {whale} {addr_disp} 刚刚 {emoji} {side or 'TRADE'} 了 “{title}” | {collateral} USDC")
-                    st.markdown(f"<div class='log-box'>{_esc(chr(10).join(lines))}</div>", unsafe_allow_html=True)
-                elif view_mode == "Cards":
-                    for t in feed:
-                        tx = str(_row_get(t, "tx_hash", "") or "")
-                        followee = str(_row_get(t, "followee", "") or "")
-                        side = str(_row_get(t, "side", "") or "")
-                        market_id = str(_row_get(t, "market_id", "") or "")
-                        slug = str(_row_get(t, "slug", "n/a") or "n/a")
-                        question = str(_row_get(t, "question", "") or "")
-                        outcome = str(_row_get(t, "outcome_label", "n/a") or "n/a")
-                        sector = _sector_for_market_text(f"{slug} {question}")
-                        pm_url = _polymarket_market_url(slug)
-                        collateral = _fmt_usdc(_row_get(t, "collateral_amount"))
-                        price = _row_get(t, "price")
-                        side_cls = "pill-buy" if side == "BUY" else ("pill-sell" if side == "SELL" else "")
-                        side_pill = f'<span class="pill {side_cls}">{_esc(side or "n/a")}</span>'
-                        sector_pill = f'<span class="pill">{_esc(sector)}</span>'
-                        if pm_url:
-                            market_html = f'<a href="{pm_url}" target="_blank">{_esc(slug)}</a>'
-                        else:
-                            market_html = _esc(slug)
-                        card = (
-                            f'<div class="feed-card">'
-                            f'<div class="feed-header">{_pfp_html(followee)}'
-                            f'<div style="min-width:0">'
-                            f'<div class="feed-title">{_esc(followee if show_full_address else _short_addr(followee))} {side_pill} {sector_pill}</div>'
-                            f'<div class="feed-sub">block {_esc(_row_get(t, "block_number"))} · collateral { _esc(collateral) } USDC · price {_esc(price)}</div>'
-                            f"</div></div>"
-                            f'<div style="margin-top:0.45rem">'
-                            f"<div><b>market</b>: {market_html} · <b>market_id</b>: {_esc(market_id or 'n/a')} · <b>outcome</b>: {_esc(outcome)}</div>"
-                            f"</div>"
-                            f'<div class="muted" style="margin-top:0.55rem">'
-                            f'<a href="{_polygonscan_tx_url(tx)}" target="_blank">tx {_esc(_short_addr(tx, n=10))}</a>'
-                            f"</div>"
-                            f"</div>"
-                        )
-                        st.markdown(card, unsafe_allow_html=True)
-                        _vspace(10)
-                else:
-                    rows = []
-                    for t in feed:
-                        tx = str(_row_get(t, "tx_hash", "") or "")
-                        followee = str(_row_get(t, "followee", "") or "")
-                        market_id = str(_row_get(t, "market_id", "") or "")
-                        slug = str(_row_get(t, "slug", "n/a") or "n/a")
-                        question = str(_row_get(t, "question", "") or "")
-                        outcome = str(_row_get(t, "outcome_label", "n/a") or "n/a")
-                        sector = _sector_for_market_text(f"{slug} {question}")
-                        pm_url = _polymarket_market_url(slug)
-                        rows.append(
-                            {
-                                "block": _row_get(t, "block_number"),
-                                "followee": followee if show_full_address else _short_addr(followee),
-                                "side": _row_get(t, "side"),
-                                "sector": sector,
-                                "market_id": market_id or "n/a",
-                                "slug": slug,
-                                "outcome": outcome,
-                                "collateral_usdc": _to_usdc(_row_get(t, "collateral_amount")),
-                                "price": _row_get(t, "price"),
-                                "pm": pm_url if pm_url else "",
-                                "tx": _polygonscan_tx_url(tx) if tx else "",
-                            }
-                        )
-                    df_feed = pd.DataFrame(rows)
-                    st.dataframe(
-                        df_feed,
-                        use_container_width=True,
-                        hide_index=True,
-                        column_config={
-                            "pm": st.column_config.LinkColumn("pm", display_text="market"),
-                            "tx": st.column_config.LinkColumn("tx", display_text="view"),
-                        },
-                    )
+            # Filters + view switch rerun as a fragment (don't re-run the watchlist above)
+            _following_feed(db_path, me_follow=me_follow, followees=followees, show_full_address=show_full_address)
 
     elif nav == c["nav_profile"]:
         back_col1, back_col2 = st.columns([1, 5])
@@ -2598,7 +3361,7 @@ def main() -> None:
         )
 
         if address.strip():
-            stats, tags, pnl_rows, trade_rows = _fetch_profile(conn, address)
+            stats, tags, pnl_rows, trade_rows = _cached_profile(db_path, address, data_version)
 
             if stats is None:
                 st.warning(c["hint_zero"])
@@ -2623,7 +3386,7 @@ def main() -> None:
                 else:
                     st.caption("Tags: (none)")
 
-                sectors = _top_sectors_for_address(conn, addr, recent_trades=800, top_k=5)
+                sectors = _cached_top_sectors(db_path, addr, 800, 5, data_version)
                 if sectors:
                     _vspace(8)
                     st.markdown("#### Market sectors (heuristic)")
@@ -2637,14 +3400,16 @@ def main() -> None:
                 st.markdown("#### 交易风格生成器")
                 st.caption("基于链上统计生成的风格摘要。")
                 nonce = 0
-                persona = _generate_style_sentence(
-                    stats["address"], stats, tags, nonce=nonce, persona_tone="normal"
+                # Keyed on the stats snapshot, so reruns of the same profile are a cache lookup.
+                stats_key = _stats_key(stats)
+                persona = _cached_style_sentence(
+                    stats["address"], stats_key, tuple(tags), nonce=nonce, persona_tone="normal"
                 )
                 st.markdown(f'<div class="card">{persona}</div>', unsafe_allow_html=True)
                 _vspace(10)
 
                 with st.expander("判定依据"):
-                    style = _classify_style(stats, tags)
+                    style = _cached_classify_style(stats_key, tuple(tags))
                     st.write(
                         {
                             "risk": style.get("risk"),
@@ -2665,17 +3430,19 @@ def main() -> None:
 
                 if pnl_rows:
                     st.markdown("#### Top resolved markets (PnL)")
+                    # Built column-wise off the cached rows; USDC scaling is a single divide per column.
+                    raw = pd.DataFrame(
+                        {k: [r[k] for r in pnl_rows] for k in ("slug", "resolution_outcome", "profit", "roi", "cost")}
+                    )
+                    scale = float(10**USDC_DECIMALS)
                     pnl_df = pd.DataFrame(
-                        [
-                            {
-                                "slug": r["slug"],
-                                "resolution": r["resolution_outcome"],
-                                "profit_usdc": _to_usdc(r["profit"]),
-                                "roi": r["roi"],
-                                "cost_usdc": _to_usdc(r["cost"]),
-                            }
-                            for r in pnl_rows
-                        ]
+                        {
+                            "slug": raw["slug"],
+                            "resolution": raw["resolution_outcome"],
+                            "profit_usdc": pd.to_numeric(raw["profit"], errors="coerce") / scale,
+                            "roi": raw["roi"],
+                            "cost_usdc": pd.to_numeric(raw["cost"], errors="coerce") / scale,
+                        }
                     )
                     st.dataframe(pnl_df, use_container_width=True, hide_index=True)
 
@@ -2684,7 +3451,7 @@ def main() -> None:
 
                 for t in trade_rows:
                     tx = t["tx_hash"]
-                    title = f"{_short_addr(tx, n=10)}  (block {t['block_number']}, log {t['log_index']})"
+                    title = f"{t['tx_short']}  (block {t['block_number']}, log {t['log_index']})"
                     with st.expander(title):
                         slug = str(_row_get(t, "slug", "n/a") or "n/a")
                         market_id = str(_row_get(t, "market_id", "") or "")
@@ -2698,9 +3465,10 @@ def main() -> None:
                             f"- **collateral (USDC)**: `{_to_usdc(t['collateral_amount'])}`\n"
                             f"- **price**: `{t['price']}`\n"
                         )
-                        try:
-                            st.json(json.loads(t["decoded_json"]))
-                        except Exception:
+                        parsed = _parse_decoded(str(t["decoded_json"]))
+                        if parsed is not None:
+                            st.json(parsed)
+                        else:
                             st.code(t["decoded_json"])
 
     elif nav == c["nav_dating"]:
@@ -2708,76 +3476,41 @@ def main() -> None:
         st.caption(c["page_dating_subtitle"])
 
         # Discover-only frosted-glass styling (scoped)
-        st.markdown(
-            """
-<style>
-  /* Frosted glass card (Discover) */
-  .discover-glass {
-    background: rgba(255, 255, 255, 0.05);
-    border: 1px solid rgba(0, 255, 255, 0.20);
-    border-radius: 15px;
-    padding: 18px 18px;
-    box-shadow: 0 4px 30px rgba(0, 0, 0, 0.35);
-    backdrop-filter: blur(6px);
-  }
-  .persona-pill {
-    display: inline-block;
-    padding: 0.22rem 0.60rem;
-    margin: 0 0.40rem 0.40rem 0;
-    border-radius: 999px;
-    border: 1px solid rgba(0, 255, 255, 0.20);
-    background: rgba(0, 255, 255, 0.06);
-    color: rgba(229,231,235,0.92);
-    font-size: 0.90rem;
-    font-weight: 800;
-  }
-  .bento {
-    display: grid;
-    grid-template-columns: 1.4fr 1fr;
-    gap: 12px;
-    margin-top: 12px;
-  }
-  .tile {
-    border: 1px solid #3d4452;
-    border-radius: 12px;
-    padding: 12px 12px;
-    background: rgba(17,24,39,0.45);
-    box-shadow: inset 0 0 0 1px rgba(61,68,82,0.30);
-  }
-  .tile-title { color: rgba(229,231,235,0.70); font-size: 0.78rem; margin-bottom: 0.25rem; }
-  .tile-big { font-size: 1.55rem; font-weight: 900; font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace; }
-  .tile-sub { color: rgba(229,231,235,0.70); margin-top: 0.25rem; font-size: 0.85rem; }
-  .tile-pos { background: rgba(34, 197, 94, 0.10); border-color: rgba(34, 197, 94, 0.25); }
-  .tile-neg { background: rgba(239, 68, 68, 0.10); border-color: rgba(239, 68, 68, 0.25); }
-  .hash-tag { color: rgba(167, 139, 250, 0.95); font-weight: 900; }
-</style>
-            """,
-            unsafe_allow_html=True,
-        )
+        _apply_discover_css()
 
         # One-tap demo: jump to a high-signal profile
         top_row = st.columns([1, 3, 3])
         if top_row[0].button("✨ Surprise Me", use_container_width=True, key="discover_surprise_me"):
-            rows = conn.execute(
+            # Score threshold and the random pick both run in SQL (one row comes back).
+            row = conn.execute(
                 """
-                SELECT address, total_profit, roi, win_rate, trades_count, markets_traded
-                FROM user_stats
-                ORDER BY total_profit DESC
-                LIMIT 1200
+                SELECT address FROM (
+                  SELECT address
+                  FROM user_stats
+                  WHERE signal_score >= 80
+                  ORDER BY total_profit DESC
+                  LIMIT 1200
+                )
+                ORDER BY random()
+                LIMIT 1
                 """
-            ).fetchall()
-            pool = []
-            for r in rows:
-                if not r:
-                    continue
-                s = _global_signal_score(r)
-                if s >= 80:
-                    pool.append(str(r["address"]))
-            if not pool and rows:
-                pool = [str(r["address"]) for r in rows[:200] if r and r["address"]]
-            if pool:
-                chosen = random.choice(pool)
-                st.session_state["dating_profile_jump"] = chosen
+            ).fetchone()
+            if row is None:
+                row = conn.execute(
+                    """
+                    SELECT address FROM (
+                      SELECT address
+                      FROM user_stats
+                      WHERE address IS NOT NULL AND address != ''
+                      ORDER BY total_profit DESC
+                      LIMIT 200
+                    )
+                    ORDER BY random()
+                    LIMIT 1
+                    """
+                ).fetchone()
+            if row is not None:
+                st.session_state["dating_profile_jump"] = str(row["address"])
                 st.rerun()
 
         follower_id = _norm_addr(st.session_state.get(follow_me_key, "") or "local")
@@ -2789,30 +3522,29 @@ def main() -> None:
             st.session_state["discover_target_idx"] = 0
 
         if top_row[1].button("✨ 换一批潜在目标", use_container_width=True, key="discover_shuffle"):
-            followees = set(_fetch_followees(conn, follower_id, limit=2000)) if follower_id else set()
+            # Already-followed addresses are dropped by an anti-join on user_follows' primary key;
+            # the 10 targets are sampled in SQL (ORDER BY random() LIMIT 10), not shuffled in Python.
             rows = conn.execute(
-                """
-                SELECT address, total_profit, total_cost, roi, win_rate, trades_count, markets_traded, max_trade_usdc
-                FROM user_stats
-                ORDER BY total_profit DESC
-                LIMIT 2000
-                """
+                f"""
+                SELECT address FROM (
+                  SELECT us.address
+                  FROM user_stats us
+                  LEFT JOIN user_follows f
+                    ON f.follower_address = ? AND f.followee_address = us.address
+                  WHERE f.followee_address IS NULL
+                    AND us.signal_score >= 60
+                    AND us.{_SQL_NOT_EXCLUDED}
+                    AND us.address != ?
+                    AND us.address != ''
+                  ORDER BY us.total_profit DESC
+                  LIMIT 2000
+                )
+                ORDER BY random()
+                LIMIT 10
+                """,
+                (follower_id, *_EXCLUDED_PARAMS, follower_id),
             ).fetchall()
-            pool = []
-            for r in rows:
-                if not r:
-                    continue
-                a = str(r["address"] or "").strip().lower()
-                if not a or a in EXCLUDED_ADDRESSES:
-                    continue
-                if follower_id and a == follower_id:
-                    continue
-                if a in followees:
-                    continue
-                if _global_signal_score(r) >= 60:
-                    pool.append(a)
-            random.shuffle(pool)
-            st.session_state["discover_targets"] = pool[:10]
+            st.session_state["discover_targets"] = [_norm_addr(r["address"]) for r in rows]
             st.session_state["discover_target_idx"] = 0
             try:
                 st.toast("已刷新 10 个潜在目标", icon="✨")
@@ -2820,14 +3552,6 @@ def main() -> None:
                 pass
             st.rerun()
 
-        # Optional toast (e.g. follow confirmation)
-        toast_msg = st.session_state.pop("discover_toast", None)
-        if toast_msg:
-            try:
-                st.toast(str(toast_msg), icon="✅")
-            except Exception:
-                pass
-
         # Auto-initialize targets (first load)
         if not st.session_state["discover_targets"]:
             try:
@@ -2835,123 +3559,7 @@ def main() -> None:
             except Exception:
                 pass
 
-        idx = _safe_int(st.session_state.get("discover_target_idx", 0))
-        targets = st.session_state.get("discover_targets") or []
-        if not targets:
-            st.info("还没有目标卡片。点上方 “✨ 换一批潜在目标”。")
-        elif idx >= len(targets):
-            st.success("这一批刷完了。点 “✨ 换一批潜在目标”。")
-        else:
-            addr = str(targets[idx])
-            stats, _tags = _fetch_profile_stats(conn, addr)
-            score = _global_signal_score(stats) if stats is not None else 0
-            handle = _short_addr(addr, n=6) if not show_full_address else addr
-            alias = _cred_alias(addr)
-            personas = _discover_personas(conn, addr, stats)
-            intro = _blogger_intro(stats)
-
-            buy_pct = _buy_ratio(conn, addr, limit=250)
-            avg_size = _avg_trade_size_usdc(conn, addr, limit=250)
-            sectors = _top_sectors_for_address(conn, addr, recent_trades=600, top_k=3) if stats is not None else []
-            profit_usdc = _to_usdc(_safe_int(stats["total_profit"], 0)) if stats is not None else None
-            profit_tile_cls = "tile-pos" if (profit_usdc is not None and profit_usdc > 0) else ("tile-neg" if (profit_usdc is not None and profit_usdc < 0) else "")
-
-            # Card (social-note style): container + intro + bento
-            with st.container(border=True):
-                st.markdown(
-                    f"""
-<div class="discover-glass">
-  <div style="display:flex; align-items:center; gap:12px;">
-    {_pfp_html(addr)}
-    <div style="min-width:0;">
-      <div style="font-weight:900; font-size:1.15rem;">
-        <span class="mono">{_esc(handle)}</span>
-        <span class="alias">· {_esc(alias)}</span>
-        <span class="muted" style="margin-left:0.6rem;">Signal {score}</span>
-      </div>
-      <div style="margin-top:0.55rem;">
-        {" ".join([f'<span class="persona-pill">{_esc(p)}</span>' for p in personas])}
-      </div>
-      <div class="muted" style="margin-top:0.45rem;">{_esc(intro)}</div>
-    </div>
-  </div>
-  <div class="bento">
-    <div class="tile {profit_tile_cls}">
-      <div class="tile-title">PnL</div>
-      <div class="tile-big">{_esc("n/a" if profit_usdc is None else f"{profit_usdc:,.2f} USDC")}</div>
-      <div class="tile-sub">ROI: {_esc(_fmt_pct(_safe_float(stats["roi"]) if stats is not None else None))} · Win: {_esc(_fmt_pct(_safe_float(stats["win_rate"]) if stats is not None else None))}</div>
-    </div>
-    <div class="tile">
-      <div class="tile-title">Behavior</div>
-      <div class="tile-sub">BUY%: <span class="mono">{_esc(_fmt_pct(buy_pct))}</span></div>
-      <div class="tile-sub">Avg Size: <span class="mono">{_esc("n/a" if avg_size is None else f"{avg_size:,.2f} USDC")}</span></div>
-    </div>
-    <div class="tile" style="grid-column: 1 / span 2;">
-      <div class="tile-title">Specialty</div>
-      <div class="tile-sub">
-        {" ".join([f'<span class="hash-tag">#{_esc(s)}</span>' for s in (sectors or ["Other"])])}
-      </div>
-    </div>
-  </div>
-</div>
-                    """,
-                    unsafe_allow_html=True,
-                )
-
-            _vspace(10)
-            with st.expander("🔍 查看链上原始证据"):
-                st.caption("每条记录都可点击 Explorer 验证（来源：Polygon `eth_getLogs` 解码）。")
-                lines = _fetch_trade_proof_lines(conn, addr, limit=6)
-                if not lines:
-                    st.write("(no trades found)")
-                for it in lines:
-                    tx = it["tx"]
-                    st.markdown(
-                        f"- <span class='muted'>Block #{_esc(it['block'])} | {_esc(it['collateral'])} USDC | Prediction: {_esc(it['prediction'])}</span> · "
-                        f"[Verify on Explorer]({_polygonscan_tx_url(tx)})",
-                        unsafe_allow_html=True,
-                    )
-
-            _vspace(10)
-            b1, b2, b3 = st.columns([1, 1, 1])
-            if b1.button("⛔ Skip (Next)", use_container_width=True, key=f"discover_skip_{addr}_{idx}"):
-                st.session_state["discover_target_idx"] = idx + 1
-                st.rerun()
-            if b2.button("💜 Follow", type="primary", use_container_width=True, key=f"discover_follow_{addr}_{idx}", disabled=not bool(follower_id)):
-                _follow(conn, follower=follower_id, followee=addr)
-                _upsert_swipe(conn, from_addr=follower_id, to_addr=addr, action="follow")
-                st.session_state["discover_toast"] = "已成功订阅该博主动态"
-                try:
-                    st.toast("已成功订阅该博主动态", icon="✅")
-                except Exception:
-                    pass
-                st.session_state["discover_target_idx"] = idx + 1
-                st.rerun()
-            if b3.button("👤 进入 Profile", use_container_width=True, key=f"discover_profile_{addr}_{idx}"):
-                st.session_state["dating_profile_jump"] = addr
-                st.rerun()
-
-            following_count = len(_fetch_followees(conn, follower_id, limit=500)) if follower_id else 0
-            st.caption(f"Batch progress: {idx+1}/{len(targets)} · Following: {following_count}")
-
-        with st.expander("My Follows (from Discover)"):
-            if not follower_id:
-                st.write("Follow identity missing.")
-            else:
-                followees = _fetch_followees(conn, follower_id, limit=200)
-                if not followees:
-                    st.write("(empty) Tap Follow on a card above.")
-                else:
-                    st.caption("Tip: the full trade feed is on the `Following` page.")
-                    for a in followees:
-                        cols = st.columns([3, 1, 1])
-                        cols[0].write(a if show_full_address else _short_addr(a))
-                        if cols[1].button("Profile", key=f"dating_follow_profile_{follower_id}_{a}"):
-                            st.session_state["dating_profile_jump"] = a
-                            st.rerun()
-                        if cols[2].button("Unfollow", key=f"dating_unfollow_{follower_id}_{a}"):
-                            _unfollow(conn, follower=follower_id, followee=a)
-                            st.rerun()
+        _discover_card(db_path, follower_id=follower_id, show_full_address=show_full_address, data_version=data_version)
 
     elif nav == c["nav_about"]:
         st.subheader(c["page_about_title"])
@@ -2978,8 +3586,6 @@ This project turns Polymarket (Polygon) on-chain `OrderFilled` events into:
     else:
         st.info("Select a page from the sidebar.")
 
-    conn.close()
-
 
 if __name__ == "__main__":
     main()